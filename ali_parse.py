@@ -3,50 +3,142 @@ import os
 from datetime import datetime
 import logging
 import asyncio
-import random
 import time
+from urllib.parse import unquote
 
 import aiohttp
-import requests
-from data import (
-    get_item_info,
-    get_shopify_one_item,
-    get_items_list_from_query,
-    save_json,
-    save_csv,
-    save_shopify_csv_one_item,
-    save_shopify_csv_list_items,
-)
-from hosting import upload_photos
-from dotenv import load_dotenv
-
-# Завантаження змінних середовища
-load_dotenv()
+import config
+import metrics
+from data import get_items_list_from_query, ExportSink
+from rate_limiter import RateLimiter, DailyLimitExceeded
+from response_cache import ResponseCache
 
 headers = {
-    "x-rapidapi-key": os.getenv('RAPID_API_KEY'),
-    "x-rapidapi-host": "aliexpress-datahub.p.rapidapi.com",
+    "x-rapidapi-key": config.RAPID_API_KEY,
+    "x-rapidapi-host": config.RAPID_API_HOST,
 }
 
-# Додаємо затримку між запитами
-async def delay_request():
-    await asyncio.sleep(random.uniform(2, 4))
+# Спільна сесія для всіх запитів до RapidAPI (keep-alive, кеш DNS)
+_session: aiohttp.ClientSession | None = None
+
+def get_session() -> aiohttp.ClientSession:
+    """Повертає спільну HTTP сесію, створюючи її за потреби."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=config.HTTP_POOL_LIMIT,
+            limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+    return _session
+
+async def start_session() -> None:
+    """Створює спільну HTTP сесію під час запуску бота."""
+    get_session()
+
+async def close_session() -> None:
+    """Закриває спільну HTTP сесію під час зупинки бота."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+# Спільний для всього процесу ліміт запитів до RapidAPI
+rate_limiter = RateLimiter(
+    rate_per_second=config.RAPID_API_RATE_PER_SECOND,
+    per_day=config.RAPID_API_DAILY_LIMIT,
+    burst=config.RAPID_API_BURST,
+    usage_path=config.RAPID_API_USAGE_PATH,
+)
+
+# Дисковий кеш відповідей
+response_cache = ResponseCache(
+    path=config.RESPONSE_CACHE_PATH,
+    ttl=config.RESPONSE_CACHE_TTL,
+    max_entries=config.RESPONSE_CACHE_MAX_ENTRIES,
+)
+
+def is_error_response(data: dict | None) -> bool:
+    """Перевіряє, чи API повернуло помилку замість даних."""
+    return not data or data.get("result", {}).get("status", {}).get("data") == "error"
+
+# Запити, які зараз виконуються: ключ запиту -> задача з відповіддю
+_in_flight: dict[str, asyncio.Task] = {}
+# Кількість запитів, об'єднаних з однаковим запитом, що вже виконувався
+# (рахується завжди, навіть якщо метрики вимкнено)
+coalesced_requests = 0
 
-async def make_request(url: str, params: dict) -> dict:
-    """Виконує HTTP запит з повторними спробами та обробкою помилок"""
+async def make_request(url: str, params: dict, use_cache: bool = True) -> dict:
+    """Виконує HTTP запит з повторними спробами та обробкою помилок.
+
+    Однакові запити (endpoint + параметри), що виконуються одночасно,
+    об'єднуються: HTTP запит надсилається один раз, а всі, хто його чекає,
+    отримують ту саму відповідь (або той самий виняток).
+    З use_cache=False відповідь не береться з кешу (але зберігається в нього).
+    """
+    global coalesced_requests
+    endpoint = url.rstrip("/").rsplit("/", 1)[-1]
+    if use_cache:
+        cached = response_cache.get(endpoint, params)
+        if response_cache.enabled_for(endpoint):
+            metrics.CACHE_REQUESTS.inc(1, "miss" if cached is None else "hit", endpoint)
+        if cached is not None:
+            return cached
+
+    key = response_cache.make_key(endpoint, params)
+    task = _in_flight.get(key)
+    if task is not None:
+        coalesced_requests += 1
+        metrics.API_COALESCED.inc(1, endpoint)
+        logging.debug(f"Запит {key} вже виконується - чекаємо на його відповідь")
+    else:
+        # Запит виконується в окремій задачі, тому скасування одного з
+        # тих, хто чекає, не скасовує запит для інших
+        task = asyncio.create_task(_send_request(url, endpoint, params))
+        _in_flight[key] = task
+        task.add_done_callback(lambda done: _request_done(key, done))
+    return await asyncio.shield(task)
+
+def _request_done(key: str, task: asyncio.Task) -> None:
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+    if not task.cancelled():
+        # Позначаємо виняток як отриманий, навіть якщо ніхто вже не чекає
+        task.exception()
+
+async def _send_request(url: str, endpoint: str, params: dict) -> dict:
+    """Надсилає запит до API з урахуванням ліміту та повторними спробами"""
     max_retries = 3
     for attempt in range(max_retries):
+        if attempt:
+            metrics.API_RETRIES.inc(1, endpoint)
         try:
-            await delay_request()
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, params=params, timeout=30) as response:
+            with metrics.timer(metrics.RATE_LIMIT_WAIT_SECONDS):
+                await rate_limiter.acquire()
+            session = get_session()
+            with metrics.timer(metrics.API_REQUEST_SECONDS, endpoint):
+                async with session.get(url, headers=headers, params=params) as response:
+                    metrics.API_REQUESTS.inc(1, endpoint, str(response.status))
                     if response.status == 429:
+                        metrics.API_RATE_LIMITED.inc(1, endpoint)
                         wait_time = int(response.headers.get('Retry-After', 60))
                         logging.warning(f"Rate limit reached. Waiting {wait_time} seconds...")
-                        await asyncio.sleep(wait_time)
+                        rate_limiter.pause(wait_time)
                         continue
                     response.raise_for_status()
-                    return await response.json()
+                    data = await response.json()
+            if not is_error_response(data):
+                # Серіалізація та commit SQLite - у потоці, щоб не блокувати цикл подій
+                await asyncio.to_thread(response_cache.set, endpoint, params, data)
+            return data
+        except DailyLimitExceeded as e:
+            logging.error(str(e))
+            return None
         except aiohttp.ClientError as e:
             if attempt == max_retries - 1:
                 logging.error(f"Failed after {max_retries} attempts: {str(e)}")
@@ -54,21 +146,35 @@ async def make_request(url: str, params: dict) -> dict:
             await asyncio.sleep(5 * (attempt + 1))
     return None
 
-async def parse_item(headers: dict, item_id: str) -> tuple[dict, dict] | None:
-    """Повертає дані про товар за ID із сайту."""
-    url = "https://aliexpress-datahub.p.rapidapi.com/item_detail_7"
-    url_reviews = "https://aliexpress-datahub.p.rapidapi.com/item_review"
-
+async def parse_item_detail(headers: dict, item_id: str, use_cache: bool = True) -> dict | None:
+    """Повертає відповідь item_detail_7 товару (без відгуків)."""
+    url = f"{config.RAPID_API_BASE_URL}/item_detail_7"
     querystring = {"itemId": item_id, "region": "US"}
+    return await make_request(url, querystring, use_cache=use_cache)
+
+async def parse_item_reviews(headers: dict, item_id: str) -> dict | None:
+    """Повертає відповідь item_review товару (перша сторінка відгуків)."""
+    url_reviews = f"{config.RAPID_API_BASE_URL}/item_review"
     querystring_reviews = {"itemId": item_id, "page": "1", "sort": "default", "filter": "allReviews"}
+    return await make_request(url_reviews, querystring_reviews)
 
-    data_item = await make_request(url, querystring)
-    if not data_item or data_item.get("result", {}).get("status", {}).get("data") == "error":
+async def parse_item(headers: dict, item_id: str) -> tuple[dict, dict] | None:
+    """Повертає дані про товар за ID із сайту."""
+    # Запити незалежні, тому виконуємо їх одночасно (кожен проходить через rate_limiter)
+    data_item, data_reviews = await asyncio.gather(
+        parse_item_detail(headers, item_id),
+        parse_item_reviews(headers, item_id),
+        return_exceptions=True
+    )
+    if isinstance(data_item, BaseException):
+        raise data_item
+    if is_error_response(data_item):
         return None
 
-    await delay_request()
-    data_reviews = await make_request(url_reviews, querystring_reviews)
-    if not data_reviews or data_reviews.get("result", {}).get("status", {}).get("data") == "error":
+    if isinstance(data_reviews, BaseException):
+        logging.error(f"Помилка отримання відгуків товару {item_id}: {data_reviews}")
+        data_reviews = None
+    elif is_error_response(data_reviews):
         data_reviews = None
 
     return data_item, data_reviews
@@ -114,9 +220,9 @@ def get_query_from_url(url: str) -> str:
         logging.error(f"Помилка отримання пошукового запиту: {e}")
         return url
 
-async def parse_query(headers: dict, query: str) -> dict:
-    """Повертає дані про товари за пошуковим запитом."""
-    url_query = "https://aliexpress-datahub.p.rapidapi.com/item_search_4"
+async def parse_query(headers: dict, query: str, page: int = 1, size: int = 50) -> dict:
+    """Повертає дані про товари за пошуковим запитом (одна сторінка результатів)."""
+    url_query = f"{config.RAPID_API_BASE_URL}/item_search_4"
     
     # Очищаємо та форматуємо пошуковий запит
     clean_query = query.replace("+", " ").strip()
@@ -136,7 +242,7 @@ async def parse_query(headers: dict, query: str) -> dict:
                 clean_query = clean_query.split("keywords=")[1].split("&")[0]
                 
             # Декодуємо URL-encoded символи
-            clean_query = requests.utils.unquote(clean_query)
+            clean_query = unquote(clean_query)
             clean_query = clean_query.replace("-", " ")
             
         except Exception as e:
@@ -147,11 +253,11 @@ async def parse_query(headers: dict, query: str) -> dict:
     
     querystring = {
         "q": clean_query,
-        "page": "1", 
+        "page": str(page),
         "sort": "total_tranpro_desc",  # Сортування за продажами
         "region": "US",
         "shipTo": "US",
-        "size": "50"
+        "size": str(size)
     }
     
     try:
@@ -193,48 +299,52 @@ def get_items_list_from_query(items: dict) -> list:
         logging.error(f"Помилка отримання списку товарів: {str(e)}")
         return []
 
-def parse_item_from_link(link: str) -> None:
-    """Парсинг та збереження одного товару за посиланням."""
-    item_id = get_item_id_from_url(link)
-    item_data = parse_item(headers, item_id)
-    if item_data:
-        item_dict = get_item_info(item_data)
-        save_json(item_dict, item_id)
-        save_csv(item_dict.copy(), item_id)
-        main_photos_url = upload_photos(item_dict["MainPhotoLinks"], f"{item_id}/MainPhotos")
-        upload_photos(item_dict["ReviewsPhotoLinks"], f"{item_id}/PhotoReview")
-        shopify_info = get_shopify_one_item(item_dict, main_photos_url)
-        save_shopify_csv_one_item(shopify_info, item_id)
-
-def parse_items_from_links(headers: dict, items_id: list, filename: str = "list_items") -> bool:
-    """Парсинг та збереження багатьох товарів із списку."""
+def get_query_total(items: dict) -> int | None:
+    """Повертає загальну кількість результатів пошуку (result.base.totalResults) або None."""
     try:
-        items = []
-        shopify_list = []
-        for item_id in items_id:
-            try:
-                item_data = parse_item(headers, str(item_id))  # Конвертуємо ID в рядок
-                if item_data:
-                    item_dict = get_item_info(item_data)
-                    if item_dict:
-                        items.append(item_dict)
-                        main_photos_url = upload_photos(item_dict.get("MainPhotoLinks", []), f"{item_id}/MainPhotos")
-                        if item_dict.get("ReviewsPhotoLinks"):
-                            upload_photos(item_dict["ReviewsPhotoLinks"], f"{item_id}/PhotoReview")
-                        shopify_info = get_shopify_one_item(item_dict, main_photos_url)
-                        shopify_list.append(shopify_info)
-            except Exception as e:
-                logging.error(f"Помилка при парсингу товару {item_id}: {str(e)}")
-                continue
-        if items and shopify_list:
-            save_json(items, filename)
-            save_csv(items, filename)
-            save_shopify_csv_list_items(shopify_list, filename)
-            return True
-        return False
-    except Exception as e:
-        logging.error(f"Помилка при парсингу списку товарів: {str(e)}")
-        return False
+        return int(items["result"]["base"]["totalResults"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+async def iter_query_items(headers: dict, query: str, limit: int, page_size: int = 50):
+    """
+    Асинхронно повертає ID товарів за пошуковим запитом, сторінка за сторінкою.
+
+    Наступна сторінка завантажується у фоні, поки обробляються товари поточної.
+    Дублікати між сторінками пропускаються, пошук зупиняється після limit товарів,
+    на порожній сторінці (або сторінці лише з уже отриманими товарами) чи коли
+    пройдено всі результати за totalResults. Неповна сторінка не вважається
+    останньою: API інколи повертає менше товарів, ніж size.
+    """
+    seen = set()
+    page = 1
+    next_page = asyncio.create_task(parse_query(headers, query, page=page, size=page_size))
+    try:
+        while next_page is not None:
+            data = await next_page
+            items_ids = get_items_list_from_query(data)
+            new_ids = [item_id for item_id in dict.fromkeys(items_ids) if item_id not in seen]
+            total = get_query_total(data)
+
+            # Префетч наступної сторінки, якщо результати ще не закінчились і ліміт не досягнуто
+            next_page = None
+            if not new_ids:
+                if page > 1:
+                    logging.info(f"Сторінка {page} без нових товарів - пошук завершено")
+            elif total is not None and page * page_size >= total:
+                logging.info(f"Отримано всі результати пошуку ({total}) - пошук завершено")
+            elif len(seen) + len(new_ids) < limit:
+                page += 1
+                next_page = asyncio.create_task(parse_query(headers, query, page=page, size=page_size))
+
+            for item_id in new_ids:
+                seen.add(item_id)
+                yield item_id
+                if len(seen) >= limit:
+                    return
+    finally:
+        if next_page is not None and not next_page.done():
+            next_page.cancel()
 
 async def parse_items_from_query(headers: dict, query: str, items_count: int, log_callback=None, folder_name="list_items") -> bool:
     """Парсинг багатьох товарів за пошуковим запитом."""
@@ -254,67 +364,32 @@ async def parse_items_from_query(headers: dict, query: str, items_count: int, lo
             await log(f"✅ Отримано пошуковий запит: {query}")
         
         await log("🔍 Пошук товарів...")
-        query_data = await parse_query(headers, query)
-        if not query_data:
-            await log("❌ Не отримано результатів пошуку")
-            return False
-            
-        items_list = get_items_list_from_query(query_data)
-        if not items_list:
-            await log("❌ Не знайдено товарів")
-            return False
-            
-        await log(f"✅ Знайдено {len(items_list)} товарів")
         await log(f"⚙️ Обробка перших {items_count} товарів")
+
+        # Імпорт тут, бо pipeline сам використовує ali_parse
+        from pipeline import run_item_pipeline
+
+        # Пошук, отримання даних, завантаження фото та запис у файли
+        # виконуються конвеєром одночасно для різних товарів
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_path = os.path.join(folder_name, f"items_{timestamp}")
+
+        with ExportSink(base_path) as sink:
+            stats = await run_item_pipeline(
+                headers,
+                iter_query_items(headers, query, items_count),
+                sink,
+                total=items_count,
+                log_callback=log_callback
+            )
         
-        # Парсимо товари
-        items_data = []
-        shopify_list = []
-        
-        for idx, item_id in enumerate(items_list[:items_count], 1):
-            try:
-                await log(f"📦 Обробка товару {idx}/{items_count}")
-                item_data = await parse_item(headers, item_id)
-                if not item_data:
-                    await log(f"❌ Помилка отримання даних товару {idx}")
-                    continue
-                    
-                item_dict = get_item_info(item_data)
-                if item_dict:
-                    items_data.append(item_dict)
-                    await log(f"📸 Завантаження фото товару {idx}")
-                    main_photos_url = upload_photos(
-                        item_dict["MainPhotoLinks"],
-                        f"{item_id}/MainPhotos"
-                    )
-                    if item_dict["ReviewsPhotoLinks"]:
-                        upload_photos(
-                            item_dict["ReviewsPhotoLinks"],
-                            f"{item_id}/PhotoReview"
-                        )
-                    shopify_info = get_shopify_one_item(item_dict, main_photos_url)
-                    shopify_list.append(shopify_info)
-                    await log(f"✅ Товар {idx} успішно оброблено")
-                    
-            except Exception as e:
-                await log(f"❌ Помилка обробки товару {idx}: {e}")
-                continue
-        
-        if items_data and shopify_list:
-            await log("💾 Збереження результатів...")
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            base_path = os.path.join(folder_name, f"items_{timestamp}")
-            
-            try:
-                save_json(items_data, base_path)
-                save_csv(items_data, base_path)
-                save_shopify_csv_list_items(shopify_list, base_path)
-                await log(f"✅ Збережено {len(items_data)} товарів")
-                return True
-            except Exception as e:
-                await log(f"❌ Помилка збереження файлів: {e}")
-                return False
-            
+        if sink.count:
+            await log(f"✅ Збережено {sink.count} товарів")
+            if stats["saved_uploads"]:
+                await log(f"♻️ Повторно використано вже завантажених фото: {stats['saved_uploads']}")
+            return True
+
+        await log("❌ Не знайдено товарів")
         return False
         
     except Exception as e:
@@ -0,0 +1,99 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """
+    Дискове сховище результатів парсингу.
+
+    Кожен результат зберігається в окремій папці, а в стані FSM лишається
+    тільки її ідентифікатор. Старі результати видаляються за віком та
+    загальним розміром сховища, крім результатів задач, що ще виконуються
+    (від create до finish).
+
+    Args:
+        root (str): Папка сховища
+        max_bytes (int): Максимальний загальний розмір (0 - без обмеження)
+        max_age (int): Максимальний вік результату в секундах (0 - без обмеження)
+    """
+
+    def __init__(self, root: str, max_bytes: int = 0, max_age: int = 0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Результати задач, що ще записуються (не видаляються evict)
+        self._active: set[str] = set()
+        self._lock = threading.Lock()
+
+    def create(self) -> str:
+        """Створює нову папку результату та повертає її ідентифікатор."""
+        self.evict()
+        artifact_id = uuid.uuid4().hex
+        with self._lock:
+            self._active.add(artifact_id)
+        os.makedirs(os.path.join(self.root, artifact_id))
+        return artifact_id
+
+    def finish(self, artifact_id: str) -> None:
+        """Позначає результат завершеним: далі його можна видаляти."""
+        with self._lock:
+            self._active.discard(artifact_id)
+
+    def path(self, artifact_id: str, name: str) -> str:
+        """Повертає шлях до файлу результату."""
+        if not artifact_id or os.sep in artifact_id or artifact_id.startswith("."):
+            raise ValueError(f"Некоректний ідентифікатор результату: {artifact_id}")
+        return os.path.join(self.root, artifact_id, name)
+
+    def exists(self, artifact_id: str, name: str) -> bool:
+        try:
+            return os.path.isfile(self.path(artifact_id, name))
+        except ValueError:
+            return False
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """Повертає (час зміни, розмір, шлях) для кожного збереженого результату."""
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for name in os.listdir(self.root):
+            folder = os.path.join(self.root, name)
+            if not os.path.isdir(folder):
+                continue
+            size = 0
+            for file_name in os.listdir(folder):
+                try:
+                    size += os.path.getsize(os.path.join(folder, file_name))
+                except OSError:
+                    continue
+            entries.append((os.path.getmtime(folder), size, folder))
+        return entries
+
+    def evict(self) -> int:
+        """Видаляє застарілі результати та найстаріші понад ліміт розміру."""
+        entries = sorted(self._entries())
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        with self._lock:
+            active = set(self._active)
+        removed = 0
+        for mtime, size, folder in entries:
+            if os.path.basename(folder) in active:
+                continue
+            too_old = self.max_age and now - mtime > self.max_age
+            too_big = self.max_bytes and total > self.max_bytes
+            if not (too_old or too_big):
+                continue
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Видалено застарілих результатів: {removed}")
+        return removed
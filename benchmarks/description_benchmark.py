@@ -0,0 +1,98 @@
+"""
+Мікробенчмарк очищення опису товару (data.get_description).
+
+Порівнює попередню реалізацію (п'ять проходів re.sub) з однопрохідною
+clean_description. За замовчуванням використовуються згенеровані описи,
+схожі на відповіді item_detail_7; можна передати власні записані відповіді API.
+
+Запуск:
+    python benchmarks/description_benchmark.py
+    python benchmarks/description_benchmark.py --payload recorded_item_detail.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from html import unescape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import get_description  # noqa: E402
+
+
+def legacy_get_description(item: dict) -> str:
+    """Попередня реалізація get_description (для порівняння)."""
+    try:
+        description_obj = item.get("result", {}).get("item", {}).get("description", {})
+        description_text = description_obj.get("text", "").strip()
+        if not description_text:
+            raw_html = description_obj.get("html", "")
+            description_text = re.sub(r'<[^>]*>', '', raw_html).strip()
+
+        description_text = re.sub(r'window\.adminAccountId=\d+;', '', description_text)
+        description_text = re.sub(r'with\(document\).*?src="[^"]+"', '', description_text, flags=re.DOTALL)
+        description_text = re.sub(r'&bull;', '', description_text)
+        description_text = re.sub(r'\s+', ' ', description_text).strip()
+        return unescape(description_text)
+    except Exception:
+        return ""
+
+
+def make_item(html: str = "", text: str = "") -> dict:
+    return {"result": {"item": {"description": {"html": html, "text": text}}}}
+
+
+def generated_payloads() -> dict[str, dict]:
+    """Описи різного розміру у форматі відповіді item_detail_7."""
+    block = (
+        '<div class="detailmodule_html"><div class="detail-desc-decorate-richtext">'
+        '<p><span style="font-size: 14px;">&bull; Material: Stainless steel &amp; silicone</span></p>\n'
+        '<p><img src="//ae01.alicdn.com/kf/S1a2b3c4d5e6f.jpg" slotmodel="image" /></p>\n'
+        '<table><tr><td>Size</td><td>42 mm</td></tr></table></div></div>\n'
+    )
+    script = (
+        '<script>window.adminAccountId=2201234567;'
+        'with(document)body.appendChild(createElement("script")).src="//assets.alicdn.com/x.js"</script>'
+    )
+    text_block = "Feature: waterproof &bull; Battery: 300mAh\n\n   window.adminAccountId=220123; "
+    return {
+        "html 10 KB": make_item(html=script + block * 40),
+        "html 200 KB": make_item(html=script + block * 800),
+        "html 1 MB": make_item(html=script + block * 4000),
+        "text 200 KB": make_item(text=text_block * 3000),
+        # Багато with(document) без src= - найгірший випадок для DOTALL-шаблону
+        "with(document) 50 KB": make_item(text="with(document) x " * 3000),
+        "unclosed tags 50 KB": make_item(html="< a " * 12000),
+    }
+
+
+def measure(func, item: dict, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(item)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк очищення опису товару")
+    parser.add_argument("--payload", action="append", default=[], help="JSON відповідь item_detail_7")
+    parser.add_argument("--repeat", type=int, default=5, help="Кількість повторів")
+    args = parser.parse_args()
+
+    payloads = generated_payloads()
+    for path in args.payload:
+        with open(path, encoding="utf-8") as f:
+            payloads[os.path.basename(path)] = json.load(f)
+
+    print(f"{'payload':<24}{'legacy, ms':>12}{'new, ms':>12}{'speedup':>10}  same output")
+    for name, item in payloads.items():
+        legacy = measure(legacy_get_description, item, args.repeat)
+        new = measure(get_description, item, args.repeat)
+        same = legacy_get_description(item) == get_description(item)
+        print(f"{name:<24}{legacy:>12.2f}{new:>12.2f}{legacy / new:>9.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
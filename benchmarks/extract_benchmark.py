@@ -0,0 +1,122 @@
+"""
+Бенчмарк етапу extract (get_item_info) у циклі подій та в пулі процесів.
+
+Проганяє згенеровані відповіді item_detail_7/item_review через extract_record
+так само, як етап extract конвеєра (з тією ж кількістю одночасних обробників),
+спочатку без пулу, потім з пулом на 1..N процесів. Для кожного режиму
+виводиться кількість товарів за секунду, прискорення відносно циклу подій та
+затримка циклу подій: паралельна задача "прокидається" кожні --tick мс, і
+запізнення показує, наскільки довго бот не зміг би відповідати користувачам.
+
+Запуск:
+    python benchmarks/extract_benchmark.py
+    python benchmarks/extract_benchmark.py --items 2000 --description-blocks 400 --processes 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["RAPID_API_KEY"] = os.environ.get("RAPID_API_KEY") or "benchmark"
+
+from benchmarks.payloads import make_item_payload, make_reviews_payload  # noqa: E402
+from pipeline import Pipeline, Stage, extract_record, get_extract_executor, shutdown_extract_executor  # noqa: E402
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def measure_lag(tick: float, lags: list[float], stop: asyncio.Event) -> None:
+    """Записує, на скільки пізніше запланованого прокидається цикл подій."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(time.perf_counter() - started - tick)
+
+
+async def run_mode(payloads: list[tuple], processes: int, tick: float) -> dict:
+    if processes > 0:
+        # Запуск процесів не входить у вимірювання (у боті пул живе весь час роботи)
+        executor = get_extract_executor(processes)
+        await asyncio.gather(*(
+            asyncio.get_running_loop().run_in_executor(executor, time.sleep, 0.1)
+            for _ in range(processes)
+        ))
+
+    records = 0
+
+    async def extract(item_data):
+        nonlocal records
+        record = await extract_record(item_data, processes)
+        records += record is not None
+        return record
+
+    lags = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(tick, lags, stop))
+    started = time.perf_counter()
+    await Pipeline([Stage("extract", extract, max(1, processes))]).run(payloads)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    return {
+        "processes": processes,
+        "records": records,
+        "seconds": elapsed,
+        "items_per_second": records / elapsed if elapsed else 0.0,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+async def main_async(args) -> list[dict]:
+    payloads = [
+        (make_item_payload(str(1008000000000000 + i), description_blocks=args.description_blocks),
+         make_reviews_payload(str(1008000000000000 + i)))
+        for i in range(args.items)
+    ]
+    results = []
+    try:
+        for processes in [0] + args.processes:
+            results.append(await run_mode(payloads, processes, args.tick / 1000))
+    finally:
+        shutdown_extract_executor()
+    return results
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Бенчмарк get_item_info у циклі подій та в пулі процесів")
+    parser.add_argument("--items", type=int, default=500, help="Кількість товарів")
+    parser.add_argument("--description-blocks", type=int, default=200,
+                        help="Кількість HTML блоків в описі товару (розмір відповіді)")
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({1, 2, cpus} | ({cpus // 2} if cpus >= 4 else set())),
+                        help="Розміри пулу процесів для порівняння")
+    parser.add_argument("--tick", type=float, default=10, help="Інтервал перевірки циклу подій, мс")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    print(f"CPU: {cpus}, товарів: {args.items}, блоків опису: {args.description_blocks}")
+    inline = results[0]["items_per_second"] or 1
+    print(f"{'processes':<11}{'items/s':>9}{'speedup':>9}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for r in results:
+        name = "inline" if not r["processes"] else str(r["processes"])
+        print(f"{name:<11}{r['items_per_second']:>9.1f}{r['items_per_second'] / inline:>8.2f}x"
+              f"{r['lag_p99_ms']:>12.1f}{r['lag_max_ms']:>12.1f}")
+
+    if any(r["records"] != args.items for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Бенчмарк пам'яті: ItemRecord проти словника, який раніше повертав get_item_info.
+
+Запуск:
+    python benchmarks/item_record_benchmark.py --items 1000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.payloads import make_item_payload, make_reviews_payload  # noqa: E402
+from data import get_item_info  # noqa: E402
+from models import ItemRecord  # noqa: E402
+
+
+def measure(build) -> tuple[int, object]:
+    """Повертає кількість байтів, виділених під результат build()."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Порівняння пам'яті ItemRecord та dict")
+    parser.add_argument("--items", type=int, default=1000, help="Кількість товарів")
+    args = parser.parse_args()
+
+    payloads = [
+        (make_item_payload(str(1005000000 + i)), make_reviews_payload(str(1005000000 + i)))
+        for i in range(args.items)
+    ]
+
+    # Повний розмір: текстові поля, списки фото та сам запис
+    dict_full, _ = measure(lambda: [get_item_info(payload).to_dict() for payload in payloads])
+    record_full, records = measure(lambda: [get_item_info(payload) for payload in payloads])
+
+    # Лише структура запису: рядки спільні, списки/кортежі фото створюються заново
+    dict_struct, _ = measure(lambda: [record.to_dict() for record in records])
+    record_struct, _ = measure(lambda: [
+        ItemRecord(record.product_id, **{
+            attr: list(value) if isinstance(value, tuple) else value
+            for attr, value in ((attr, getattr(record, attr)) for _, attr in ItemRecord.FIELDS)
+        })
+        for record in records
+    ])
+
+    print(f"Товарів: {args.items}")
+    for title, dict_size, record_size in (
+        ("Повний запис", dict_full, record_full),
+        ("Лише структура", dict_struct, record_struct),
+    ):
+        print(f"{title}:")
+        print(f"  dict:       {dict_size / 1024:10.1f} KB  ({dict_size / args.items:7.0f} B/товар)")
+        print(f"  ItemRecord: {record_size / 1024:10.1f} KB  ({record_size / args.items:7.0f} B/товар)")
+        print(f"  Економія:   {(1 - record_size / dict_size) * 100:9.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Згенеровані відповіді RapidAPI у форматі item_detail_7 / item_review / item_search_4."""
+
+
+def make_item_payload(item_id: str, photos: int = 8, description_blocks: int = 40) -> dict:
+    """Відповідь item_detail_7 для одного товару."""
+    block = (
+        '<div class="detailmodule_html"><p><span style="font-size: 14px;">'
+        f'&bull; Item {item_id}: stainless steel &amp; silicone</span></p>\n'
+        f'<p><img src="//ae01.alicdn.com/kf/{item_id}desc.jpg" /></p></div>\n'
+    )
+    return {
+        "result": {
+            "status": {"data": "success", "code": 200},
+            "item": {
+                "itemId": item_id,
+                "itemUrl": f"//www.aliexpress.com/item/{item_id}.html",
+                "title": f"Smart watch {item_id} waterproof fitness tracker",
+                "wishCount": 1500,
+                "images": [f"//ae01.alicdn.com/kf/{item_id}_{i}.jpg" for i in range(photos)],
+                "properties": {"list": [
+                    {"name": "Brand Name", "value": "NoEnName_Null"},
+                    {"name": "Material", "value": "Stainless steel"},
+                    {"name": "Battery Capacity", "value": "300mAh"},
+                ]},
+                "description": {
+                    "html": '<script>window.adminAccountId=2201234567;</script>' + block * description_blocks,
+                    "images": [],
+                },
+                "sku": {"def": {"price": "25.99 - 31.50", "promotionPrice": "12.99 - 15.75"}},
+            },
+            "reviews": {"averageStar": "4.8", "count": 320},
+            "delivery": {"shippingList": [{"note": ["Free shipping", "Mar 12 - 20"]}]},
+        }
+    }
+
+
+def make_reviews_payload(item_id: str, photos: int = 6) -> dict:
+    """Відповідь item_review для одного товару."""
+    return {
+        "result": {
+            "status": {"data": "success", "code": 200},
+            "resultList": [
+                {"review": {
+                    "reviewContent": "Great watch",
+                    "reviewImages": [f"//ae01.alicdn.com/kf/{item_id}_review_{i}.jpg"],
+                }}
+                for i in range(photos)
+            ],
+        }
+    }
+
+
+def make_search_payload(first_id: int, size: int = 50) -> dict:
+    """Відповідь item_search_4 зі сторінкою товарів."""
+    return {
+        "result": {
+            "status": {"data": "success", "code": 200},
+            "resultList": [{"item": {"itemId": str(first_id + i)}} for i in range(size)],
+        }
+    }
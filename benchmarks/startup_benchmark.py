@@ -0,0 +1,89 @@
+"""
+Бенчмарк холодного запуску бота (time-to-first-poll).
+
+Кожен запуск відбувається в окремому процесі: імпортується bot.py, виконуються
+обробники startup, а замість реального polling фіксується час. Мережа не потрібна.
+Бази даних і результати бота створюються в тимчасовій папці, тому задачі
+справжнього бота з cache/checkpoints.sqlite3 не продовжуються.
+
+Запуск:
+    python benchmarks/startup_benchmark.py --runs 10
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модулі, які не повинні імпортуватися під час запуску
+HEAVY_MODULES = ["pandas", "cloudinary", "requests"]
+
+CHILD_CODE = r"""
+import asyncio, json, sys, time
+started = time.perf_counter()
+import bot
+imported = time.perf_counter()
+
+async def first_poll(*args, **kwargs):
+    await bot.dp.emit_startup(bot=bot.bot)
+    ready = time.perf_counter()
+    await bot.dp.emit_shutdown(bot=bot.bot)
+    await bot.bot.session.close()
+    return ready
+
+bot.dp.start_polling = first_poll
+ready = asyncio.run(bot.main()) or time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "first_poll": ready - started,
+    "heavy": [name for name in HEAVY if name in sys.modules],
+}))
+"""
+
+
+def run_once(tmp_dir: str) -> dict:
+    """Запускає бота в окремому процесі та повертає виміряні часи."""
+    env = dict(os.environ)
+    env.setdefault("TELEGRAM_API_KEY", "123456:BENCHMARK")
+    env.setdefault("RAPID_API_KEY", "benchmark")
+    env["CHECKPOINTS_PATH"] = os.path.join(tmp_dir, "checkpoints.sqlite3")
+    env["ARTIFACTS_DIR"] = os.path.join(tmp_dir, "artifacts")
+    env["RESPONSE_CACHE_PATH"] = os.path.join(tmp_dir, "responses.sqlite3")
+    env["UPLOAD_MANIFEST_PATH"] = os.path.join(tmp_dir, "uploads.sqlite3")
+    env["RAPID_API_USAGE_PATH"] = os.path.join(tmp_dir, "api_usage.sqlite3")
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + CHILD_CODE
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк часу запуску бота")
+    parser.add_argument("--runs", type=int, default=5, help="Кількість запусків")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="startup_benchmark_")
+    try:
+        results = [run_once(tmp_dir) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    for key, title in (("import", "import bot"), ("first_poll", "time-to-first-poll"), ("process", "процес повністю")):
+        values = [r[key] * 1000 for r in results]
+        print(f"{title:<22} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms")
+    heavy = sorted({name for r in results for name in r["heavy"]})
+    print(f"Важкі модулі під час запуску: {', '.join(heavy) if heavy else 'немає'}")
+
+
+if __name__ == "__main__":
+    main()
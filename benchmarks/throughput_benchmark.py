@@ -0,0 +1,310 @@
+"""
+Офлайн-бенчмарк пропускної здатності парсера.
+
+Піднімає локальний aiohttp сервер замість RapidAPI (item_detail_7, item_review,
+item_search_4) із заданою затримкою та часткою відповідей 429, підміняє
+Cloudinary заглушкою і проганяє режими Single, Query та Multiple через
+конвеєр парсингу так само, як бот. Для кожного режиму виводиться кількість
+товарів за секунду, p50/p95 часу обробки одного товару та пікова пам'ять.
+Мережа та ключі API не потрібні.
+
+Режим Stall - як Multiple, але перший товар відповідає із затримкою --stall
+секунд; пікова пам'ять показує, чи не накопичуються наступні товари в буфері
+упорядкування. З --max-peak-mb бенчмарк завершується з помилкою, якщо пікова
+пам'ять будь-якого режиму перевищує поріг.
+
+Запуск:
+    python benchmarks/throughput_benchmark.py
+    python benchmarks/throughput_benchmark.py --items 200 --latency 0.15 --rate-limit-ratio 0.02
+    python benchmarks/throughput_benchmark.py --fixtures recorded/ --json results.json
+    python benchmarks/throughput_benchmark.py --modes stall --items 5000 --stall 20 --max-peak-mb 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Налаштування мають бути задані до імпорту config
+_TMP_DIR = tempfile.mkdtemp(prefix="parser_benchmark_")
+os.environ["RAPID_API_KEY"] = os.environ.get("RAPID_API_KEY") or "benchmark"
+os.environ["RAPID_API_DAILY_LIMIT"] = "0"
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(_TMP_DIR, "responses.sqlite3")
+os.environ["UPLOAD_MANIFEST_PATH"] = os.path.join(_TMP_DIR, "uploads.sqlite3")
+os.environ["RAPID_API_USAGE_PATH"] = os.path.join(_TMP_DIR, "api_usage.sqlite3")
+for _endpoint in ("ITEM_DETAIL", "ITEM_REVIEW", "ITEM_SEARCH"):
+    os.environ[f"CACHE_TTL_{_endpoint}"] = "0"
+
+
+def _apply_env_args() -> None:
+    """Переносить аргументи, від яких залежить config, у змінні середовища."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--api-rate", type=float, default=1000)
+    args, _ = parser.parse_known_args()
+    os.environ["RAPID_API_RATE_PER_SECOND"] = str(args.api_rate)
+    os.environ["RAPID_API_BURST"] = str(max(1, int(args.api_rate)))
+
+
+_apply_env_args()
+
+from aiohttp import web  # noqa: E402
+
+import ali_parse  # noqa: E402
+import config  # noqa: E402
+import hosting  # noqa: E402
+import metrics  # noqa: E402
+from benchmarks.payloads import make_item_payload, make_reviews_payload, make_search_payload  # noqa: E402
+from data import ExportSink  # noqa: E402
+from pipeline import run_item_pipeline  # noqa: E402
+
+
+class FakeRapidAPI:
+    """Локальний сервер у форматі відповідей RapidAPI."""
+
+    def __init__(self, latency: float, jitter: float, rate_limit_ratio: float,
+                 retry_after: int, fixtures: dict[str, str],
+                 stall_items: set[str] | None = None, stall: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.fixtures = fixtures
+        # Товари, відповідь на які затримується на stall секунд
+        self.stall_items = stall_items or set()
+        self.stall = stall
+        self.requests = 0
+        self.rate_limited = 0
+        # Час першого запиту item_detail_7 для кожного товару
+        self.first_seen: dict[str, float] = {}
+        self._random = random.Random(42)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/item_detail_7", self.item_detail)
+        app.router.add_get("/item_review", self.item_review)
+        app.router.add_get("/item_search_4", self.item_search)
+        return app
+
+    async def _respond(self, endpoint: str, make_payload) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if self.rate_limit_ratio and self._random.random() < self.rate_limit_ratio:
+            self.rate_limited += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.retry_after)})
+        if endpoint in self.fixtures:
+            return web.Response(text=self.fixtures[endpoint], content_type="application/json")
+        return web.json_response(make_payload())
+
+    async def item_detail(self, request: web.Request) -> web.Response:
+        item_id = request.query["itemId"]
+        self.first_seen.setdefault(item_id, time.perf_counter())
+        if item_id in self.stall_items:
+            await asyncio.sleep(self.stall)
+        return await self._respond("item_detail_7", lambda: make_item_payload(item_id))
+
+    async def item_review(self, request: web.Request) -> web.Response:
+        item_id = request.query["itemId"]
+        return await self._respond("item_review", lambda: make_reviews_payload(item_id))
+
+    async def item_search(self, request: web.Request) -> web.Response:
+        page = int(request.query.get("page", 1))
+        size = int(request.query.get("size", 50))
+        return await self._respond(
+            "item_search_4",
+            lambda: make_search_payload(1006000000000000 + (page - 1) * size, size)
+        )
+
+
+class FakeUploader:
+    """Заглушка cloudinary.uploader із затримкою на кожне фото."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.uploads = 0
+        self._lock = threading.Lock()
+
+    def upload(self, photo_url: str, folder: str = "", **options) -> dict:
+        time.sleep(self.latency)
+        with self._lock:
+            self.uploads += 1
+        public_id = f"{folder}/{photo_url.rsplit('/', 1)[-1].rsplit('.', 1)[0]}"
+        return {"url": f"https://res.cloudinary.test/{public_id}.jpg", "public_id": public_id}
+
+
+class TimingSink(ExportSink):
+    """ExportSink, що запам'ятовує час запису кожного товару."""
+
+    def __init__(self, base_path: str):
+        super().__init__(base_path)
+        self.written: dict[str, float] = {}
+
+    def write(self, item, shopify_rows) -> None:
+        super().write(item, shopify_rows)
+        self.written[item.product_id] = time.perf_counter()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def run_mode(name: str, jobs: list, server: FakeRapidAPI, trace_memory: bool) -> dict:
+    """
+    Виконує задачі одного режиму по черзі (як воркер бота) та збирає статистику.
+
+    jobs - список (source, total) для run_item_pipeline.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    latencies = []
+    job_metrics = []
+    saved = failed = 0
+    started = time.perf_counter()
+    for idx, (source, total) in enumerate(jobs):
+        with TimingSink(os.path.join(_TMP_DIR, f"{name}_{idx}")) as sink:
+            stats = await run_item_pipeline(ali_parse.headers, source, sink, total=total)
+        saved += stats["saved"]
+        failed += stats["failed"]
+        job_metrics.append(stats["metrics"])
+        latencies.extend(
+            written - server.first_seen[item_id]
+            for item_id, written in sink.written.items()
+            if item_id in server.first_seen
+        )
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "mode": name,
+        "jobs": len(jobs),
+        "saved": saved,
+        "failed": failed,
+        "seconds": elapsed,
+        "items_per_second": saved / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "peak_memory_mb": peak / 1024 / 1024,
+        "metrics": job_metrics[-1] if job_metrics else "",
+    }
+
+
+def load_fixtures(folder: str | None) -> dict[str, str]:
+    """Читає записані відповіді API (<endpoint>.json) з папки."""
+    fixtures = {}
+    if not folder:
+        return fixtures
+    for endpoint in ("item_detail_7", "item_review", "item_search_4"):
+        path = os.path.join(folder, f"{endpoint}.json")
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                fixtures[endpoint] = json.dumps(json.load(f))
+    return fixtures
+
+
+async def main_async(args) -> list[dict]:
+    stall_ids = [str(1009000000000000 + i) for i in range(args.items)]
+    server = FakeRapidAPI(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_ratio=args.rate_limit_ratio,
+        retry_after=args.retry_after,
+        fixtures=load_fixtures(args.fixtures),
+        stall_items={stall_ids[0]},
+        stall=args.stall,
+    )
+    runner = web.AppRunner(server.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    config.RAPID_API_BASE_URL = f"http://127.0.0.1:{port}"
+
+    uploader = FakeUploader(args.upload_latency)
+    hosting.set_uploader(uploader)
+
+    # Кожен режим отримує власні ID, щоб маніфест фото не впливав на інші режими
+    single_jobs = [([str(1005000000000000 + i)], 1) for i in range(args.single_runs)]
+    multiple_ids = [str(1007000000000000 + i) for i in range(args.items)]
+    modes = {
+        "single": lambda: single_jobs,
+        "query": lambda: [(ali_parse.iter_query_items(ali_parse.headers, "benchmark watch", args.items), args.items)],
+        "multiple": lambda: [(multiple_ids, len(multiple_ids))],
+        "stall": lambda: [(stall_ids, len(stall_ids))],
+    }
+
+    results = []
+    try:
+        for name in args.modes:
+            results.append(await run_mode(name, modes[name](), server, not args.no_memory))
+    finally:
+        await ali_parse.close_session()
+        await runner.cleanup()
+
+    print(f"API: затримка {args.latency * 1000:.0f} мс (+{args.jitter * 1000:.0f}), "
+          f"запитів {server.requests}, відповідей 429: {server.rate_limited}; "
+          f"фото завантажено: {uploader.uploads}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк пропускної здатності парсера")
+    parser.add_argument("--modes", nargs="+", default=["single", "query", "multiple"],
+                        choices=["single", "query", "multiple", "stall"], help="Режими парсингу")
+    parser.add_argument("--items", type=int, default=100, help="Кількість товарів для Query та Multiple")
+    parser.add_argument("--single-runs", type=int, default=10, help="Кількість задач Single")
+    parser.add_argument("--latency", type=float, default=0.1, help="Затримка відповіді API, с")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Випадкова добавка до затримки, с")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Частка відповідей 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After для відповідей 429, с")
+    parser.add_argument("--upload-latency", type=float, default=0.05, help="Час завантаження одного фото, с")
+    parser.add_argument("--api-rate", type=float, default=1000, help="Ліміт запитів до API за секунду")
+    parser.add_argument("--stall", type=float, default=10, help="Затримка першого товару в режимі Stall, с")
+    parser.add_argument("--max-peak-mb", type=float, default=0,
+                        help="Максимальна пікова пам'ять режиму, МБ (0 - без перевірки)")
+    parser.add_argument("--fixtures", help="Папка із записаними відповідями <endpoint>.json")
+    parser.add_argument("--no-memory", action="store_true", help="Не вимірювати пікову пам'ять")
+    parser.add_argument("--metrics", action="store_true", help="Показати метрики етапів останньої задачі режиму")
+    parser.add_argument("--json", help="Зберегти результати у JSON файл")
+    args = parser.parse_args()
+    metrics.enabled = metrics.enabled or args.metrics
+
+    try:
+        results = asyncio.run(main_async(args))
+    finally:
+        shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+    print(f"{'mode':<10}{'saved':>7}{'failed':>8}{'sec':>8}{'items/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'peak MB':>9}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['saved']:>7}{r['failed']:>8}{r['seconds']:>8.2f}{r['items_per_second']:>9.1f}"
+              f"{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}{r['peak_memory_mb']:>9.1f}")
+    if args.metrics:
+        for r in results:
+            print(f"{r['mode']}: {r['metrics']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    # Ненульовий код виходу, якщо якийсь режим нічого не зберіг
+    # або перевищив поріг пам'яті (для CI)
+    if any(not r["saved"] for r in results):
+        sys.exit(1)
+    if args.max_peak_mb and any(r["peak_memory_mb"] > args.max_peak_mb for r in results):
+        print(f"Пікова пам'ять перевищує {args.max_peak_mb:.0f} МБ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
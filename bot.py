@@ -3,9 +3,6 @@ import os
 import asyncio
 import shutil
 from datetime import datetime
-import json
-import io
-import pandas as pd
 
 from aiogram import Bot, Dispatcher, types
 from aiogram.fsm.storage.memory import MemoryStorage
@@ -19,38 +16,27 @@ from aiogram.types import (
     InlineKeyboardButton,
     FSInputFile
 )
-from dotenv import load_dotenv
+
+import config
+import metrics
 
 # Імпорти з парсера
 from ali_parse import (
     headers,
-    parse_item,
-    parse_query,
+    iter_query_items,
     get_item_id_from_url,
-    get_items_list_from_query,
-    parse_items_from_query
-)
-from data import (
-    get_item_info,
-    get_shopify_one_item,
-    save_json,
-    save_csv,
-    save_shopify_csv_one_item,
-    save_shopify_csv_list_items,
-    prepare_csv,
-    prepare_shopify_csv
+    start_session,
+    close_session
 )
-from hosting import upload_photos
+from data import ExportSink
+from jobs import JobQueue
+from artifacts import ArtifactStore
+from progress import ProgressReporter
+from pipeline import run_item_pipeline, shutdown_extract_executor
+from checkpoints import CheckpointStore, CheckpointSink
+from models import ItemRecord
 
-# Завантаження змінних середовища
-load_dotenv()
-
-# Спробуємо отримати токен з різних можливих назв змінних
-BOT_TOKEN = (
-    os.getenv("TELEGRAM_BOT_TOKEN") or 
-    os.getenv("TELEGRAM_API_KEY") or 
-    os.getenv("BOT_TOKEN")
-)
+BOT_TOKEN = config.BOT_TOKEN
 
 if not BOT_TOKEN:
     raise ValueError(
@@ -59,7 +45,7 @@ if not BOT_TOKEN:
     )
 
 # Перевіряємо інші необхідні змінні
-RAPID_API_KEY = os.getenv("RAPID_API_KEY")
+RAPID_API_KEY = config.RAPID_API_KEY
 if not RAPID_API_KEY:
     raise ValueError(
         "API ключ не знайдено! "
@@ -70,14 +56,37 @@ if not RAPID_API_KEY:
 logging.basicConfig(level=logging.INFO)
 
 # Створення папки для результатів
-if not os.path.exists("list_items"):
-    os.makedirs("list_items")
+if not os.path.exists(config.RESULTS_DIR):
+    os.makedirs(config.RESULTS_DIR)
 
 # Ініціалізація бота та диспетчера
 bot = Bot(token=BOT_TOKEN)
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
+# Черга фонових задач парсингу
+job_queue = JobQueue(workers=config.JOB_WORKERS)
+
+# Результати парсингу зберігаються на диску, у state - лише ідентифікатор
+artifact_store = ArtifactStore(
+    config.ARTIFACTS_DIR,
+    max_bytes=config.ARTIFACTS_MAX_BYTES,
+    max_age=config.ARTIFACTS_MAX_AGE
+)
+RESULT_BASE_NAME = "result"
+
+# Контрольні точки задач для продовження після перезапуску бота
+checkpoint_store = CheckpointStore(config.CHECKPOINTS_PATH)
+
+# Формат завантаження: (файл у сховищі, ім'я файлу для користувача, підпис)
+EXPORT_FORMATS = {
+    "json": (f"{RESULT_BASE_NAME}.json", "item_{item_id}.json", "📄 JSON файл"),
+    "csv": (f"{RESULT_BASE_NAME}.csv", "item_{item_id}.csv", "📄 CSV файл"),
+    "shopify": (f"{RESULT_BASE_NAME}_shopify.csv", "item_{item_id}_shopify.csv", "📄 Shopify CSV файл"),
+    "ndjson": (f"{RESULT_BASE_NAME}.ndjson", "item_{item_id}.ndjson", "📄 NDJSON файл"),
+    "parquet": (f"{RESULT_BASE_NAME}.parquet", "item_{item_id}.parquet", "📄 Parquet файл"),
+}
+
 # Стани FSM
 class ParsingStates(StatesGroup):
     choosing_mode = State()
@@ -122,6 +131,11 @@ limit_keyboard = InlineKeyboardMarkup(
             InlineKeyboardButton(text="50", callback_data="limit_50"),
             InlineKeyboardButton(text="60", callback_data="limit_60")
         ],
+        [
+            InlineKeyboardButton(text="100", callback_data="limit_100"),
+            InlineKeyboardButton(text="200", callback_data="limit_200"),
+            InlineKeyboardButton(text="500", callback_data="limit_500")
+        ],
         [InlineKeyboardButton(text="🔙 Головне меню", callback_data="main_menu")]
     ]
 )
@@ -138,146 +152,176 @@ async def update_status_message(message: types.Message, text: str):
     except Exception as e:
         logging.error(f"Помилка оновлення статусу: {e}")
 
-async def start_parsing_process(message: types.Message, state: FSMContext):
-    data = await state.get_data()
-    mode = data['mode']
-    link = data['link']
-    limit = data.get('limit', 1)
-    
-    status_message = await message.answer("🚀 Починаємо парсинг...")
-    logs = []
-    
-    async def update_status(text: str):
-        logs.append(text)
-        try:
-            await status_message.edit_text("\n".join(logs))
-        except Exception as e:
-            if "message is not modified" not in str(e):
-                logging.error(f"Помилка оновлення статусу: {e}")
-    
+async def skip_done_items(items_id, done_ids: set):
+    """Пропускає товари, які вже оброблені в попередній спробі задачі"""
+    async for item_id in items_id:
+        if item_id not in done_ids:
+            yield item_id
+
+async def start_parsing_process(job: dict, state: FSMContext):
+    mode = job['mode']
+    link = job['link']
+    limit = job['limit']
+    job_id = job['job_id']
+
+    await asyncio.to_thread(checkpoint_store.start_attempt, job_id)
+    done_items = await asyncio.to_thread(checkpoint_store.done_items, job_id)
+    done_ids = {item_id for item_id, _, _ in done_items}
+
+    status_message = await bot.send_message(
+        job['chat_id'],
+        "🔄 Продовжуємо перерваний парсинг..." if job['attempts'] else "🚀 Починаємо парсинг..."
+    )
+    update_status = ProgressReporter(
+        status_message,
+        interval=config.PROGRESS_INTERVAL,
+        max_lines=config.PROGRESS_MAX_LINES
+    )
+
     try:
         if mode == "single":
             await update_status("⚙️ Парсинг одного товару...")
             item_id = get_item_id_from_url(link)
             if not item_id:
-                await status_message.edit_text("❌ Некоректне посилання")
+                await update_status.finish("❌ Некоректне посилання")
                 return
-                
-            await update_status("⏳ Отримання даних товару...")
-            item_data = await parse_item(headers, item_id)
-            if not item_data:
-                await status_message.edit_text("❌ Не вдалося отримати дані товару")
-                return
-                
-            await update_status("⚙️ Обробка даних...")
-            item_dict = get_item_info(item_data)
-            
-            await update_status("📸 Завантаження фотографій...")
-            try:
-                uploaded_urls = upload_photos(item_dict)
-                item_dict["MainPhotoLinks"] = uploaded_urls.get("MainPhotos", [])
-                item_dict["ReviewsPhotoLinks"] = uploaded_urls.get("PhotoReviews", [])
-            except Exception as e:
-                logging.error(f"Помилка завантаження фото: {e}")
-                await status_message.edit_text("❌ Помилка при завантаженні фотографій")
-                return
-            
-            await update_status("🛍️ Підготовка даних для Shopify...")
-            shopify_info = get_shopify_one_item(item_dict, uploaded_urls["MainPhotos"])
+            source, total = [item_id], 1
 
         elif mode == "query":
             await update_status(f"⚙️ Парсинг товарів за запитом (ліміт: {limit})...")
-            query_data = await parse_query(headers, link)
-            if not query_data:
-                await status_message.edit_text("❌ Помилка при парсингу запиту")
-                return
-                
-            items_list = get_items_list_from_query(query_data)[:limit]
-            items_data = []
-            shopify_list = []
-            
-            for idx, item_id in enumerate(items_list, 1):
-                await update_status(f"📦 Обробка товару {idx}/{limit}")
-                item_data = await parse_item(headers, item_id)
-                if item_data:
-                    item_dict = get_item_info(item_data)
-                    uploaded_urls = upload_photos(item_dict)
-                    item_dict["MainPhotoLinks"] = uploaded_urls.get("MainPhotos", [])
-                    item_dict["ReviewsPhotoLinks"] = uploaded_urls.get("PhotoReviews", [])
-                    items_data.append(item_dict)
-                    shopify_info = get_shopify_one_item(item_dict, uploaded_urls["MainPhotos"])
-                    shopify_list.append(shopify_info)
-                    await update_status(f"✅ Товар {idx} успішно оброблено")
+            # Сторінки пошуку підвантажуються, поки обробляються товари
+            source, total = iter_query_items(headers, link, limit), limit
 
         elif mode == "multiple":
             links_list = [l.strip() for l in link.split(",") if l.strip()]
             if not links_list:
-                await status_message.edit_text("❌ Список посилань порожній")
+                await update_status.finish("❌ Список посилань порожній")
                 return
-            
-            items_data = []
-            shopify_list = []
-            
-            for idx, item_link in enumerate(links_list, 1):
-                await update_status(f"📦 Обробка товару {idx}/{len(links_list)}")
-                
-                item_id = get_item_id_from_url(item_link)
+
+            items_ids = [get_item_id_from_url(item_link) for item_link in links_list]
+            for idx, item_id in enumerate(items_ids, 1):
                 if not item_id:
                     await update_status(f"⚠️ Пропущено товар {idx}: некоректне посилання")
-                    continue
-                
-                item_data = await parse_item(headers, item_id)
-                if not item_data:
-                    await update_status(f"⚠️ Пропущено товар {idx}: помилка отримання даних")
-                    continue
-                
-                item_dict = get_item_info(item_data)
-                uploaded_urls = upload_photos(item_dict)
-                item_dict["MainPhotoLinks"] = uploaded_urls.get("MainPhotos", [])
-                item_dict["ReviewsPhotoLinks"] = uploaded_urls.get("PhotoReviews", [])
-                items_data.append(item_dict)
-                shopify_info = get_shopify_one_item(item_dict, uploaded_urls["MainPhotos"])
-                shopify_list.append(shopify_info)
-                await update_status(f"✅ Товар {idx} успішно оброблено")
-
-        # Зберігаємо дані в state
-        if mode == "single":
-            await state.update_data({
-                'json_data': json.dumps(item_dict, ensure_ascii=False, indent=2),
-                'csv_data': [item_dict],
-                'shopify_data': shopify_info,
-                'item_id': item_id
-            })
-        else:
-            await state.update_data({
-                'json_data': json.dumps(items_data, ensure_ascii=False, indent=2),
-                'csv_data': items_data,
-                'shopify_data': shopify_list,
-                'item_id': 'multiple_result'
-            })
+            source = [item_id for item_id in items_ids if item_id]
+            total = len(source)
+
+        # Товари, оброблені до перезапуску бота, не отримуються повторно
+        if done_ids:
+            await update_status(f"♻️ Відновлено з контрольної точки товарів: {len(done_ids)}")
+            if isinstance(source, list):
+                source = [item_id for item_id in source if item_id not in done_ids]
+            else:
+                source = skip_done_items(source, done_ids)
+            total = max(0, total - len(done_ids))
+
+        # Товари обробляються конвеєром і одразу записуються у сховище,
+        # а в state зберігається лише ідентифікатор результату
+        artifact_id = await asyncio.to_thread(artifact_store.create)
+        try:
+            # Для одного товару result.json містить об'єкт, як і раніше
+            with ExportSink(artifact_store.path(artifact_id, RESULT_BASE_NAME), single=mode == "single") as sink:
+                for _, record, shopify_rows in done_items:
+                    sink.write(ItemRecord.from_dict(record), shopify_rows)
+                checkpoint_sink = CheckpointSink(sink, checkpoint_store, job_id)
+                try:
+                    stats = await run_item_pipeline(
+                        headers,
+                        source,
+                        checkpoint_sink,
+                        total=total,
+                        log_callback=update_status
+                    )
+                finally:
+                    # Зберігаємо й останню неповну пачку, навіть якщо задачу скасовано
+                    await asyncio.shield(checkpoint_sink.flush())
+        finally:
+            # Поки задача виконується, її результат не видаляється за розміром чи віком
+            artifact_store.finish(artifact_id)
+
+        if not sink.count:
+            await update_status.finish(
+                "❌ Не вдалося отримати дані товару" if mode == "single"
+                else "❌ Не вдалося отримати дані жодного товару",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                    [InlineKeyboardButton(text="🔄 Спробувати знову", callback_data="new_parsing")]
+                ])
+            )
+            return
+
+        await state.update_data({
+            'artifact_id': artifact_id,
+            'item_id': item_id if mode == "single" else 'multiple_result',
+            'file_ids': {}
+        })
 
         # Створюємо клавіатуру для завантаження
-        download_keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        download_buttons = [
             [InlineKeyboardButton(text="📥 Завантажити JSON", callback_data="download_json")],
             [InlineKeyboardButton(text="📥 Завантажити CSV", callback_data="download_csv")],
             [InlineKeyboardButton(text="📥 Завантажити Shopify CSV", callback_data="download_shopify")],
-            [InlineKeyboardButton(text="🔄 Новий парсинг", callback_data="new_parsing")]
-        ])
-
-        await status_message.edit_text(
-            "✅ Парсинг завершено! Оберіть формат для завантаження:",
-            reply_markup=download_keyboard
-        )
+        ]
+        # NDJSON та Parquet - лише якщо файли створено (див. EXPORT_EXTRA_FORMATS)
+        extra_buttons = [
+            InlineKeyboardButton(text=f"📥 {label}", callback_data=f"download_{file_type}")
+            for file_type, label in (("ndjson", "NDJSON"), ("parquet", "Parquet"))
+            if artifact_store.exists(artifact_id, EXPORT_FORMATS[file_type][0])
+        ]
+        if extra_buttons:
+            download_buttons.append(extra_buttons)
+        download_buttons.append([InlineKeyboardButton(text="🔄 Новий парсинг", callback_data="new_parsing")])
+        download_keyboard = InlineKeyboardMarkup(inline_keyboard=download_buttons)
+
+        done_text = "✅ Парсинг завершено! Оберіть формат для завантаження:"
+        if stats["failed"]:
+            done_text += f"\n⚠️ Пропущено товарів: {stats['failed']}"
+        if stats["saved_uploads"]:
+            done_text += f"\n♻️ Повторно використано вже завантажених фото: {stats['saved_uploads']}"
+        await update_status.finish(done_text, reply_markup=download_keyboard)
 
     except Exception as e:
         logging.error(f"Помилка: {e}")
-        await status_message.edit_text(
+        await update_status.finish(
             f"❌ Помилка при парсингу: {str(e)}",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="🔄 Спробувати знову", callback_data="new_parsing")]
             ])
         )
 
+async def run_job(job: dict, state: FSMContext):
+    """Виконує задачу парсингу та видаляє її контрольні точки.
+
+    Якщо задачу скасовано під час зупинки бота, контрольні точки лишаються,
+    і задача продовжиться після перезапуску.
+    """
+    cancelled = False
+    try:
+        await start_parsing_process(job, state)
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        # Задача, що завершилась помилкою, не повторюється після перезапуску
+        if not cancelled:
+            await asyncio.to_thread(checkpoint_store.finish, job['job_id'])
+
+async def submit_job(job: dict, state: FSMContext) -> int:
+    """Додає задачу в чергу та повертає кількість задач інших користувачів перед нею"""
+    position = job_queue.position(job['user_id'])
+    await job_queue.submit(job['user_id'], lambda: run_job(job, state), name=job['job_id'])
+    return position
+
+async def resume_jobs():
+    """Повертає в чергу задачі, перервані перезапуском бота"""
+    for job in checkpoint_store.unfinished():
+        if job['attempts'] >= config.CHECKPOINT_MAX_ATTEMPTS:
+            logging.warning(f"Задачу {job['job_id']} не продовжено: вичерпано спроби ({job['attempts']})")
+            checkpoint_store.finish(job['job_id'])
+            continue
+        state = dp.fsm.get_context(bot, chat_id=job['chat_id'], user_id=job['user_id'])
+        await state.set_state(ParsingStates.parsing)
+        await submit_job(job, state)
+        logging.info(f"Задачу {job['job_id']} користувача {job['user_id']} повернуто в чергу")
+
 @dp.callback_query(lambda c: c.data == "new_parsing")
 async def new_parsing(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
@@ -294,41 +338,29 @@ async def process_download(callback: types.CallbackQuery, state: FSMContext):
         data = await state.get_data()
         file_type = callback.data.split("_")[1]
         item_id = data.get('item_id', 'query_result')
-
-        if file_type == "json":
-            # Для JSON використовуємо збережені дані
-            file_content = data.get('json_data', '{}')
-            if isinstance(file_content, (dict, list)):
-                file_content = json.dumps(file_content, ensure_ascii=False, indent=2)
-            filename = f"item_{item_id}.json"
-            caption = "📄 JSON файл"
-        
-        elif file_type == "csv":
-            # Для CSV конвертуємо дані
-            csv_data = data.get('csv_data', [])
-            file_content = prepare_csv(csv_data)
-            filename = f"item_{item_id}.csv"
-            caption = "📄 CSV файл"
-        
-        elif file_type == "shopify":
-            # Для Shopify конвертуємо дані
-            shopify_data = data.get('shopify_data', [])
-            file_content = prepare_shopify_csv(shopify_data)
-            filename = f"item_{item_id}_shopify.csv"
-            caption = "📄 Shopify CSV файл"
-        
-        # Перевіряємо, чи є контент
-        if not file_content:
-            raise ValueError("Порожній вміст файлу")
+        artifact_id = data.get('artifact_id')
+        file_name, filename, caption = EXPORT_FORMATS[file_type]
+
+        # Telegram file_id вже надісланих файлів - повторно файл не завантажується
+        file_ids = data.get('file_ids', {})
+        if file_type in file_ids:
+            document = file_ids[file_type]
+        elif artifact_id and artifact_store.exists(artifact_id, file_name):
+            document = FSInputFile(
+                artifact_store.path(artifact_id, file_name),
+                filename=filename.format(item_id=item_id)
+            )
+        else:
+            await callback.answer(
+                "⌛ Результати парсингу більше недоступні. Запустіть парсинг знову",
+                show_alert=True
+            )
+            return
 
         # Відправляємо файл
-        await callback.message.answer_document(
-            document=types.BufferedInputFile(
-                file_content.encode('utf-8'),
-                filename=filename
-            ),
-            caption=caption
-        )
+        sent = await callback.message.answer_document(document=document, caption=caption)
+        if file_type not in file_ids and sent.document:
+            await state.update_data(file_ids={**file_ids, file_type: sent.document.file_id})
         await callback.answer("✅ Файл надіслано")
         
     except Exception as e:
@@ -453,7 +485,8 @@ async def help_command(message: types.Message):
         "❗️ *Важливо:*\n"
         "• Слідкуй за лімітом - не більше 300 запитів/день\n"
         "• Перевіряй посилання\n"
-        "• Для відміни жми - 🔙Повернутись до головного меню\n\n"
+        "• Для відміни жми - 🔙Повернутись до головного меню\n"
+        "• Стан черги задач - /queue\n\n"
         
         "✨ *Успішного парсингу* ✨"
     )
@@ -462,11 +495,32 @@ async def help_command(message: types.Message):
 @dp.message(StateFilter(ParsingStates.entering_link))
 async def process_link(message: types.Message, state: FSMContext):
     """Обробник введення посилання/запиту"""
-    data = await state.get_data()
     await state.update_data(link=message.text)
-    
-    # Одразу починаємо парсинг
-    await start_parsing_process(message, state)
+    await state.set_state(ParsingStates.parsing)
+    data = await state.get_data()
+
+    # Параметри задачі зберігаються на диску, щоб продовжити її після перезапуску,
+    # а парсинг виконується у фоновій черзі, щоб не блокувати обробник
+    job = checkpoint_store.create(
+        user_id=message.from_user.id,
+        chat_id=message.chat.id,
+        mode=data['mode'],
+        link=message.text,
+        limit=data.get('limit', 1)
+    )
+    position = await submit_job(job, state)
+    if position:
+        await message.answer(f"⏳ Задачу додано в чергу. Перед вами задач: {position}")
+
+@dp.message(Command("queue"))
+async def cmd_queue(message: types.Message):
+    """Обробник команди /queue - стан черги задач"""
+    stats = job_queue.stats()
+    await message.answer(
+        f"📊 Задач у черзі: {stats['depth']}\n"
+        f"⚙️ Виконується: {stats['running']}/{stats['workers']}\n"
+        f"⏱ Середнє очікування: {stats['avg_wait']:.1f} с (макс. {stats['max_wait']:.1f} с)"
+    )
 
 @dp.message()
 async def unknown_command(message: types.Message, state: FSMContext):
@@ -478,6 +532,23 @@ async def unknown_command(message: types.Message, state: FSMContext):
             reply_markup=main_keyboard
         )
 
+async def on_startup():
+    """Готує спільні ресурси перед початком роботи бота"""
+    await start_session()
+    await job_queue.start()
+    await resume_jobs()
+    await metrics.start_server()
+
+async def on_shutdown():
+    """Звільняє спільні ресурси під час зупинки бота"""
+    await job_queue.stop()
+    await metrics.stop_server()
+    await close_session()
+    shutdown_extract_executor()
+
+dp.startup.register(on_startup)
+dp.shutdown.register(on_shutdown)
+
 async def main():
     await dp.start_polling(bot)
 
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import config
+from models import ItemRecord
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Контрольні точки задач парсингу на основі SQLite.
+
+    Для кожної задачі зберігаються її параметри, а після оброблених
+    товарів - запис товару (з уже завантаженими в Cloudinary посиланнями) та
+    рядки для Shopify. Після перезапуску бота незавершені задачі продовжуються
+    з тими самими параметрами, а вже оброблені товари не отримуються та не
+    завантажуються повторно.
+
+    Args:
+        path (str): Шлях до файлу бази даних
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Відкриває базу даних при першому зверненні."""
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, chat_id INTEGER NOT NULL, "
+                "mode TEXT NOT NULL, link TEXT NOT NULL, item_limit INTEGER NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_items ("
+                "job_id TEXT NOT NULL, item_id TEXT NOT NULL, record TEXT NOT NULL, "
+                "shopify_rows TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (job_id, item_id))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def create(self, user_id: int, chat_id: int, mode: str, link: str, limit: int) -> dict:
+        """Реєструє нову задачу та повертає її параметри."""
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "mode": mode,
+            "link": link,
+            "limit": limit,
+            "attempts": 0,
+        }
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO jobs (job_id, user_id, chat_id, mode, link, item_limit, attempts, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                (job["job_id"], user_id, chat_id, mode, link, limit, time.time())
+            )
+            conn.commit()
+        return job
+
+    def start_attempt(self, job_id: str) -> None:
+        """Враховує чергову спробу виконання задачі."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE jobs SET attempts = attempts + 1 WHERE job_id = ?", (job_id,))
+            conn.commit()
+
+    def unfinished(self) -> list[dict]:
+        """Повертає задачі, які не були завершені (у порядку створення)."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT job_id, user_id, chat_id, mode, link, item_limit, attempts "
+                "FROM jobs ORDER BY created"
+            ).fetchall()
+        return [
+            dict(zip(("job_id", "user_id", "chat_id", "mode", "link", "limit", "attempts"), row))
+            for row in rows
+        ]
+
+    def add_items(self, job_id: str, items: list[tuple[str, dict, list[dict], float]]) -> None:
+        """Зберігає оброблені товари задачі однією транзакцією: (item_id, запис, рядки Shopify, час)."""
+        rows = [
+            (job_id, item_id, json.dumps(record, ensure_ascii=False),
+             json.dumps(shopify_rows, ensure_ascii=False), created)
+            for item_id, record, shopify_rows, created in items
+        ]
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO job_items (job_id, item_id, record, shopify_rows, created) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка запису контрольної точки задачі {job_id}: {e}")
+
+    def done_items(self, job_id: str) -> list[tuple[str, dict, list[dict]]]:
+        """Повертає вже оброблені товари задачі: (item_id, запис, рядки Shopify)."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT item_id, record, shopify_rows FROM job_items WHERE job_id = ? ORDER BY created",
+                (job_id,)
+            ).fetchall()
+        return [(item_id, json.loads(record), json.loads(shopify_rows)) for item_id, record, shopify_rows in rows]
+
+    def finish(self, job_id: str) -> None:
+        """Видаляє контрольні точки завершеної задачі."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CheckpointSink:
+    """
+    Обгортка над ExportSink, що зберігає контрольну точку задачі.
+
+    Записані товари накопичуються та зберігаються пачками по batch_size
+    в окремому потоці, щоб запис SQLite не блокував цикл подій. Після
+    завершення конвеєра потрібно викликати flush().
+    """
+
+    def __init__(self, sink, store: CheckpointStore, job_id: str,
+                 batch_size: int = config.CHECKPOINT_BATCH_SIZE):
+        self.sink = sink
+        self.store = store
+        self.job_id = job_id
+        self.batch_size = max(1, batch_size)
+        self._batch = []
+        self._saving = []
+
+    @property
+    def count(self) -> int:
+        return self.sink.count
+
+    def write(self, item: ItemRecord, shopify_rows: list[dict]) -> None:
+        self.sink.write(item, shopify_rows)
+        self._batch.append((item.product_id, item.to_dict(with_product_id=True), shopify_rows, time.time()))
+        if len(self._batch) >= self.batch_size:
+            self._save_batch()
+
+    def _save_batch(self) -> None:
+        """Запускає збереження накопичених товарів у потоці."""
+        batch, self._batch = self._batch, []
+        self._saving = [task for task in self._saving if not task.done()]
+        self._saving.append(asyncio.ensure_future(asyncio.to_thread(self.store.add_items, self.job_id, batch)))
+
+    async def flush(self) -> None:
+        """Зберігає решту товарів і чекає завершення всіх записів."""
+        if self._batch:
+            self._save_batch()
+        saving, self._saving = self._saving, []
+        await asyncio.gather(*saving)
@@ -0,0 +1,269 @@
+"""
+Парсинг товарів AliExpress з командного рядка (без бота та GUI).
+
+Запуск:
+    python cli.py bulk urls.txt
+    cat urls.txt | python cli.py bulk - --concurrency 8 -o list_items/catalog
+    python cli.py watch --add urls.txt
+    python cli.py watch --interval 3600
+    python cli.py uploads --folder 1005006123456789
+
+Вхідний файл містить посилання на товари або їх ID - по одному в рядку
+(або через кому/пробіл). Рядки, що починаються з #, пропускаються.
+
+Режим watch перевіряє товари зі списку відстеження, у яких минув інтервал
+перевірки, і зберігає лише ті, в яких змінилися ціна, рейтинг або кількість
+лайків (зміни - у файлі <output>_changes.ndjson).
+
+Команда uploads видаляє записи з маніфесту завантажених фото (наприклад, якщо
+фото видалено з Cloudinary вручну), щоб наступний парсинг завантажив їх знову.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import config
+import metrics
+from ali_parse import headers, get_item_id_from_url, close_session, rate_limiter
+from data import ExportSink
+from hosting import upload_manifest
+from pipeline import run_item_pipeline, shutdown_extract_executor
+from watchlist import WatchStore, run_watch
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+def parse_item_ids(line: str) -> list[str]:
+    """Повертає ID товарів з рядка (посилання або ID через кому чи пробіл)."""
+    items_id = []
+    for token in line.replace(",", " ").split():
+        if token.startswith("#"):
+            break
+        item_id = token if token.isdigit() else get_item_id_from_url(token)
+        if item_id:
+            items_id.append(item_id)
+        else:
+            logger.warning(f"Пропущено некоректне посилання: {token}")
+    return items_id
+
+
+async def read_item_ids(stream, seen: set):
+    """Поступово читає ID товарів з файлу чи stdin, пропускаючи повтори."""
+    while True:
+        line = await asyncio.to_thread(stream.readline)
+        if not line:
+            return
+        for item_id in parse_item_ids(line):
+            if item_id not in seen:
+                seen.add(item_id)
+                yield item_id
+
+
+class ProgressPrinter:
+    """Виводить у stderr кількість оброблених товарів не частіше ніж раз на interval секунд."""
+
+    def __init__(self, interval: float = 1.0, enabled: bool = True):
+        self.interval = interval
+        self.enabled = enabled
+        self.started = time.monotonic()
+        self._last = 0.0
+
+    async def __call__(self, done: int, total: int) -> None:
+        now = time.monotonic()
+        if not self.enabled or now - self._last < self.interval:
+            return
+        self._last = now
+        rate = done / (now - self.started) if now > self.started else 0.0
+        sys.stderr.write(f"\rОброблено товарів: {done} ({rate:.1f}/с)")
+        sys.stderr.flush()
+
+    def close(self) -> None:
+        if self.enabled and self._last:
+            sys.stderr.write("\n")
+
+
+async def run_bulk(args) -> int:
+    """Обробляє всі товари з файлу та повертає код завершення."""
+    output = args.output or os.path.join(config.RESULTS_DIR, f"bulk_{datetime.now():%Y%m%d_%H%M%S}")
+    folder = os.path.dirname(output)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    progress = ProgressPrinter(enabled=not args.quiet)
+    seen = set()
+    try:
+        with ExportSink(output) as sink:
+            stats = await run_item_pipeline(
+                headers,
+                read_item_ids(stream, seen),
+                sink,
+                progress_callback=progress,
+                fetch_concurrency=args.concurrency,
+                upload_concurrency=args.upload_concurrency,
+                queue_size=args.queue_size,
+                extract_processes=args.processes
+            )
+    finally:
+        progress.close()
+        if stream is not sys.stdin:
+            stream.close()
+        await close_session()
+        shutdown_extract_executor()
+
+    elapsed = stats["elapsed"]
+    print(f"Товарів у файлі: {len(seen)}, збережено: {stats['saved']}, пропущено: {stats['failed']}")
+    print(f"Час: {elapsed:.1f} с, швидкість: {stats['saved'] / elapsed if elapsed else 0:.2f} товарів/с")
+    print(f"Запитів до RapidAPI за сьогодні: {rate_limiter.used_today}")
+    if stats["saved_uploads"]:
+        print(f"Повторно використано вже завантажених фото: {stats['saved_uploads']}")
+    if stats["coalesced"]:
+        print(f"Об'єднано однакових запитів до API: {stats['coalesced']}")
+    for stage, stage_stats in stats["stages"].items():
+        print(f"  {stage:<8} оброблено {stage_stats['processed']:>6}, зайнято {stage_stats['busy_time']:8.1f} с")
+    if stats["metrics"]:
+        print(f"Метрики: {stats['metrics']}")
+    if sink.count:
+        print(f"Файли: {', '.join(sink.paths)}")
+    return 0 if sink.count else 1
+
+
+def read_item_ids_file(path: str) -> list[str]:
+    """Повертає ID товарів з файлу (- для stdin) без повторів."""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return list(dict.fromkeys(item_id for line in stream for item_id in parse_item_ids(line)))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+async def run_watch_command(args) -> int:
+    """Оновлює список відстеження та перевіряє товари, у яких минув інтервал."""
+    store = WatchStore(args.db)
+    try:
+        if args.add:
+            added = store.add(read_item_ids_file(args.add))
+            print(f"Додано до відстеження товарів: {added}")
+        if args.remove:
+            removed = store.remove(read_item_ids_file(args.remove))
+            print(f"Видалено з відстеження товарів: {removed}")
+        if args.no_check:
+            print(f"Товарів у списку відстеження: {store.count()}")
+            return 0
+
+        output = args.output or os.path.join(config.RESULTS_DIR, f"watch_{datetime.now():%Y%m%d_%H%M%S}")
+        folder = os.path.dirname(output)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        progress = ProgressPrinter(enabled=not args.quiet)
+        try:
+            with ExportSink(output) as sink:
+                stats = await run_watch(
+                    headers, store, sink, f"{output}_changes.ndjson", args.interval,
+                    limit=args.limit,
+                    progress_callback=progress,
+                    fetch_concurrency=args.concurrency,
+                    extract_processes=args.processes
+                )
+        finally:
+            progress.close()
+            await close_session()
+            shutdown_extract_executor()
+        watched = store.count()
+    finally:
+        store.close()
+
+    if not stats["checked"]:
+        print(f"Немає товарів для перевірки (у списку: {watched}, інтервал: {args.interval} с)")
+        return 0
+    print(f"Перевірено: {stats['checked']}, без змін: {stats['unchanged']}, "
+          f"змінено або нових: {len(stats['changed'])}, помилок: {stats['failed']}")
+    print(f"Запитів до RapidAPI за сьогодні: {rate_limiter.used_today}")
+    for entry in stats["changed"]:
+        if entry["New"]:
+            continue
+        fields = ", ".join(f"{field}: {change['old']} → {change['new']}" for field, change in entry["Changes"].items())
+        print(f"  {entry['ItemId']}: {fields}")
+    if stats["metrics"]:
+        print(f"Метрики: {stats['metrics']}")
+    if sink.count:
+        print(f"Файли: {', '.join(sink.paths + [f'{output}_changes.ndjson'])}")
+    return 1 if stats["failed"] == stats["checked"] else 0
+
+
+async def run_uploads_command(args) -> int:
+    """Видаляє записи з маніфесту завантажених фото."""
+    if not (args.url or args.folder or args.all):
+        print("Вкажіть --url, --folder або --all")
+        return 1
+    try:
+        deleted = upload_manifest.invalidate(args.url, args.folder)
+    finally:
+        upload_manifest.close()
+    print(f"Видалено записів з маніфесту завантажень: {deleted}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Парсинг товарів AliExpress з командного рядка")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Докладний лог")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bulk = subparsers.add_parser("bulk", help="Пакетний парсинг товарів зі списку посилань або ID")
+    bulk.add_argument("input", help="Файл з посиланнями або ID товарів (- для stdin)")
+    bulk.add_argument("-o", "--output", help="Шлях до файлів результату без розширення")
+    bulk.add_argument("--concurrency", type=int, default=config.PIPELINE_FETCH_CONCURRENCY,
+                      help="Кількість товарів, які отримуються одночасно")
+    bulk.add_argument("--upload-concurrency", type=int, default=config.PIPELINE_UPLOAD_CONCURRENCY,
+                      help="Кількість товарів, які одночасно завантажують фото")
+    bulk.add_argument("--queue-size", type=int, default=config.PIPELINE_QUEUE_SIZE,
+                      help="Розмір черги між етапами конвеєра")
+    bulk.add_argument("--processes", type=int, default=config.EXTRACT_PROCESSES,
+                      help="Кількість процесів для розбору відповідей API (0 - в основному процесі)")
+    bulk.add_argument("--metrics", action="store_true", help="Показати метрики етапів")
+    bulk.add_argument("-q", "--quiet", action="store_true", help="Не показувати прогрес")
+    bulk.set_defaults(handler=run_bulk)
+
+    watch = subparsers.add_parser("watch", help="Відстеження змін цін, рейтингу та лайків товарів")
+    watch.add_argument("--add", metavar="FILE", help="Додати товари з файлу до списку відстеження (- для stdin)")
+    watch.add_argument("--remove", metavar="FILE", help="Видалити товари з файлу зі списку відстеження")
+    watch.add_argument("--no-check", action="store_true", help="Лише оновити список, без перевірки товарів")
+    watch.add_argument("--db", default=config.WATCH_DB_PATH, help="База списку відстеження")
+    watch.add_argument("--interval", type=int, default=config.WATCH_INTERVAL,
+                       help="Перевіряти товари, які не перевірялися довше цього часу, с")
+    watch.add_argument("--limit", type=int, default=0, help="Максимальна кількість товарів за запуск (0 - усі)")
+    watch.add_argument("-o", "--output", help="Шлях до файлів змінених товарів без розширення")
+    watch.add_argument("--concurrency", type=int, default=config.PIPELINE_FETCH_CONCURRENCY,
+                       help="Кількість товарів, які перевіряються одночасно")
+    watch.add_argument("--processes", type=int, default=config.EXTRACT_PROCESSES,
+                       help="Кількість процесів для розбору відповідей API (0 - в основному процесі)")
+    watch.add_argument("--metrics", action="store_true", help="Показати метрики етапів")
+    watch.add_argument("-q", "--quiet", action="store_true", help="Не показувати прогрес")
+    watch.set_defaults(handler=run_watch_command)
+
+    uploads = subparsers.add_parser("uploads", help="Скинути маніфест завантажених фото, щоб завантажити їх знову")
+    uploads.add_argument("--url", help="Посилання на фото з AliExpress")
+    uploads.add_argument("--folder", help="Папка Cloudinary або її початок (наприклад, ID товару)")
+    uploads.add_argument("--all", action="store_true", help="Очистити весь маніфест")
+    uploads.set_defaults(handler=run_uploads_command)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    if not config.RAPID_API_KEY:
+        sys.exit("API ключ не знайдено! Переконайтеся, що в файлі .env встановлено RAPID_API_KEY")
+    metrics.enabled = metrics.enabled or getattr(args, "metrics", False)
+    sys.exit(asyncio.run(args.handler(args)))
+
+
+if __name__ == "__main__":
+    main()
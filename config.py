@@ -0,0 +1,95 @@
+import os
+
+from dotenv import load_dotenv
+
+# Завантаження змінних середовища (один раз для всього застосунку)
+load_dotenv()
+
+# Telegram: спробуємо отримати токен з різних можливих назв змінних
+BOT_TOKEN = (
+    os.getenv("TELEGRAM_BOT_TOKEN") or
+    os.getenv("TELEGRAM_API_KEY") or
+    os.getenv("BOT_TOKEN")
+)
+
+# RapidAPI
+RAPID_API_KEY = os.getenv("RAPID_API_KEY")
+RAPID_API_HOST = "aliexpress-datahub.p.rapidapi.com"
+# Адреса API (можна змінити на локальний сервер, наприклад для бенчмарків)
+RAPID_API_BASE_URL = os.getenv("RAPID_API_BASE_URL", f"https://{RAPID_API_HOST}").rstrip("/")
+RAPID_API_RATE_PER_SECOND = float(os.getenv("RAPID_API_RATE_PER_SECOND", 1))
+RAPID_API_DAILY_LIMIT = int(os.getenv("RAPID_API_DAILY_LIMIT", 300))
+RAPID_API_BURST = int(os.getenv("RAPID_API_BURST", 1))
+# Лічильник денного ліміту (спільний для бота, CLI та GUI і зберігається після перезапуску)
+RAPID_API_USAGE_PATH = os.getenv("RAPID_API_USAGE_PATH", os.path.join("cache", "api_usage.sqlite3"))
+
+# Пул з'єднань до RapidAPI
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 20))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 10))
+HTTP_KEEPALIVE_TIMEOUT = int(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+
+# Кількість товарів, які отримуються одночасно
+PARSE_CONCURRENCY = int(os.getenv("PARSE_CONCURRENCY", 4))
+
+# Дисковий кеш відповідей (TTL у секундах, 0 - не кешувати)
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join("cache", "responses.sqlite3"))
+RESPONSE_CACHE_TTL = {
+    "item_detail_7": int(os.getenv("CACHE_TTL_ITEM_DETAIL", 6 * 3600)),
+    "item_review": int(os.getenv("CACHE_TTL_ITEM_REVIEW", 24 * 3600)),
+    "item_search_4": int(os.getenv("CACHE_TTL_ITEM_SEARCH", 0)),
+}
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000))
+
+# Cloudinary
+CLOUD_NAME = os.getenv("CLOUD_NAME")
+CLOUDINARY_API_KEY = os.getenv("API_KEY")
+CLOUDINARY_API_SECRET = os.getenv("API_SECRET")
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", 8))
+UPLOAD_MANIFEST_PATH = os.getenv("UPLOAD_MANIFEST_PATH", os.path.join("cache", "uploads.sqlite3"))
+UPLOAD_MANIFEST_MAX_AGE = int(os.getenv("UPLOAD_MANIFEST_MAX_AGE", 0))
+
+# Конвеєр парсингу: кількість товарів, які одночасно отримуються та
+# завантажують фото, і розмір черги між етапами
+PIPELINE_FETCH_CONCURRENCY = int(os.getenv("PIPELINE_FETCH_CONCURRENCY", PARSE_CONCURRENCY))
+PIPELINE_UPLOAD_CONCURRENCY = int(os.getenv("PIPELINE_UPLOAD_CONCURRENCY", 2))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 8))
+# Кількість процесів для get_item_info (0 - виконувати в основному процесі)
+EXTRACT_PROCESSES = int(os.getenv("EXTRACT_PROCESSES", 0))
+
+# Кількість воркерів, які одночасно виконують задачі парсингу
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 3))
+
+# Статус парсингу в Telegram: інтервал оновлення (с) та кількість рядків
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", 2))
+PROGRESS_MAX_LINES = int(os.getenv("PROGRESS_MAX_LINES", 20))
+
+# Сховище готових результатів (розмір у байтах, вік у секундах)
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "artifacts")
+ARTIFACTS_MAX_BYTES = int(os.getenv("ARTIFACTS_MAX_BYTES", 500 * 1024 * 1024))
+ARTIFACTS_MAX_AGE = int(os.getenv("ARTIFACTS_MAX_AGE", 24 * 3600))
+
+# Контрольні точки задач парсингу (для продовження після перезапуску бота)
+CHECKPOINTS_PATH = os.getenv("CHECKPOINTS_PATH", os.path.join("cache", "checkpoints.sqlite3"))
+CHECKPOINT_MAX_ATTEMPTS = int(os.getenv("CHECKPOINT_MAX_ATTEMPTS", 3))
+# Кількість товарів, що записуються в контрольну точку однією транзакцією
+CHECKPOINT_BATCH_SIZE = int(os.getenv("CHECKPOINT_BATCH_SIZE", 20))
+
+# Відстеження цін (cli.py watch): база знімків та інтервал повторної перевірки товару (с).
+# Інтервал трохи менший за добу, щоб щоденний запуск перевіряв усі товари
+WATCH_DB_PATH = os.getenv("WATCH_DB_PATH", os.path.join("cache", "watch.sqlite3"))
+WATCH_INTERVAL = int(os.getenv("WATCH_INTERVAL", 20 * 3600))
+
+# Метрики (Prometheus). Вимкнені за замовчуванням; METRICS_PORT=0 - без HTTP endpoint
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+
+# Додаткові формати результатів поруч з JSON/CSV: ndjson, parquet (parquet потребує pyarrow)
+EXPORT_EXTRA_FORMATS = tuple(
+    fmt.strip().lower() for fmt in os.getenv("EXPORT_EXTRA_FORMATS", "ndjson,parquet").split(",") if fmt.strip()
+)
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", 1000))
+
+# Папка для результатів
+RESULTS_DIR = os.getenv("RESULTS_DIR", "list_items")
@@ -1,10 +1,13 @@
+import io
 import json
 import csv
 import os
 import re
 from html import unescape
 import logging
-import pandas as pd
+
+import config
+from models import ItemRecord
 
 # Налаштування логування
 logger = logging.getLogger(__name__)
@@ -57,8 +60,8 @@ def get_range_price(items: dict) -> float:
         return 0.0
 
 
-def get_item_info(item_data: tuple) -> dict:
-    """Повертає інформацію про товар у вигляді словника."""
+def get_item_info(item_data: tuple) -> ItemRecord:
+    """Повертає інформацію про товар у вигляді ItemRecord."""
     try:
         item, reviews = item_data
         product_id = item["result"]['item']['itemId']
@@ -91,28 +94,20 @@ def get_item_info(item_data: tuple) -> dict:
         except Exception as e:
             logger.error(f"Помилка при отриманні основних фото: {e}")
         
-        # Формуємо правильні посилання для Cloudinary
-        cloud_name = os.getenv('CLOUD_NAME')
-        hosting_folder_links = [
-            f"https://res.cloudinary.com/{cloud_name}/{product_id}/MainPhotos",
-            f"https://res.cloudinary.com/{cloud_name}/{product_id}/PhotoReviews"
-        ]
-        
-        return {
-            "Link": f"https:{item['result']['item']['itemUrl']}",
-            "Title": item["result"]["item"]["title"],
-            "DiscountPrice": item.get('result', {}).get("item", {}).get("sku", {}).get("def", {}).get("promotionPrice", ""),
-            "OriginalPrice": item.get('result', {}).get("item", {}).get("sku", {}).get("def", {}).get("price", ""),
-            "Rating": float(item["result"]["reviews"]["averageStar"]),
-            "Likes": item["result"]["item"]["wishCount"],
-            "MainDeliveryOption": get_delivery_option(item),
-            "Description": get_description(item),
-            "Specifications": specs_info,
-            "MainPhotoLinks": main_photo_links,
-            "ReviewsPhotoLinks": reviews_photo_links,
-            "HostingFolderLink": hosting_folder_links,
-            
-        }
+        return ItemRecord(
+            product_id,
+            link=f"https:{item['result']['item']['itemUrl']}",
+            title=item["result"]["item"]["title"],
+            discount_price=item.get('result', {}).get("item", {}).get("sku", {}).get("def", {}).get("promotionPrice", ""),
+            original_price=item.get('result', {}).get("item", {}).get("sku", {}).get("def", {}).get("price", ""),
+            rating=float(item["result"]["reviews"]["averageStar"]),
+            likes=item["result"]["item"]["wishCount"],
+            delivery_option=get_delivery_option(item),
+            description=get_description(item),
+            specifications=specs_info,
+            main_photo_links=main_photo_links,
+            reviews_photo_links=reviews_photo_links,
+        )
         
     except Exception as e:
         logger.error(f"Помилка при обробці даних товару: {e}")
@@ -130,20 +125,59 @@ def get_delivery_option(item: dict) -> str:
         return ""
 
 
+# Шаблони очищення опису. [^<>]* зупиняється на наступному "<", тому пошук тегів
+# лінійний навіть для некоректного HTML (на відміну від <[^>]*>)
+_HTML_TAG_RE = re.compile(r'<[^<>]*>')
+_ADMIN_ACCOUNT_RE = re.compile(r'window\.adminAccountId=\d+;')
+_WITH_DOCUMENT = "with(document)"
+
+
+def _strip_with_document(text: str) -> str:
+    """Видаляє фрагменти with(document)...src="..." (кожен символ переглядається один раз)."""
+    out = []
+    pos = 0
+    while True:
+        start = text.find(_WITH_DOCUMENT, pos)
+        if start == -1:
+            break
+        src = text.find('src="', start + len(_WITH_DOCUMENT))
+        while src != -1 and text.startswith('"', src + 5):
+            src = text.find('src="', src + 6)
+        end = text.find('"', src + 6) if src != -1 else -1
+        if end == -1:
+            # Далі немає жодного src="...", тому решта тексту залишається без змін
+            break
+        out.append(text[pos:start])
+        pos = end + 1
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def clean_description(text: str, is_html: bool = False) -> str:
+    """
+    Очищає опис товару: видаляє HTML теги (для is_html), службові фрагменти
+    AliExpress (window.adminAccountId, with(document)...src="...", &bull;)
+    та стискає пробіли. Час роботи лінійний від довжини тексту.
+    """
+    if is_html:
+        text = _HTML_TAG_RE.sub("", text)
+    # Дешеві перевірки підрядка дозволяють пропустити непотрібні проходи
+    if "window.adminAccountId=" in text:
+        text = _ADMIN_ACCOUNT_RE.sub("", text)
+    if _WITH_DOCUMENT in text:
+        text = _strip_with_document(text)
+    text = text.replace("&bull;", "")
+    return unescape(" ".join(text.split()))
+
+
 def get_description(item: dict) -> str:
     """Отримує опис товару."""
     try:
         description_obj = item.get("result", {}).get("item", {}).get("description", {})
         description_text = description_obj.get("text", "").strip()
-        if not description_text:
-            raw_html = description_obj.get("html", "")
-            description_text = re.sub(r'<[^>]*>', '', raw_html).strip()
-        
-        description_text = re.sub(r'window\.adminAccountId=\d+;', '', description_text)
-        description_text = re.sub(r'with\(document\).*?src="[^"]+"', '', description_text, flags=re.DOTALL)
-        description_text = re.sub(r'&bull;', '', description_text)
-        description_text = re.sub(r'\s+', ' ', description_text).strip()
-        return unescape(description_text)
+        if description_text:
+            return clean_description(description_text)
+        return clean_description(description_obj.get("html", ""), is_html=True)
     except Exception:
         return ""
 
@@ -160,7 +194,7 @@ def get_items_list_from_query(query_data: dict) -> list:
         return []
 
 
-def get_shopify_one_item(items: dict, photos_url: list[str]) -> list[dict]:
+def get_shopify_one_item(items: ItemRecord | dict, photos_url: list[str]) -> list[dict]:
     """Готує дані одного товару для Shopify."""
     body_html = (
         f"{items.get('Specifications', '')}\n"
@@ -238,25 +272,354 @@ def get_shopify_one_item(items: dict, photos_url: list[str]) -> list[dict]:
     return shopify_items
 
 
-def save_json(data: dict | list, filename: str) -> None:
+# Колонки CSV з даними товару (у порядку полів get_item_info)
+ITEM_COLUMNS = [
+    "Link", "Title", "DiscountPrice", "OriginalPrice", "Rating", "Likes",
+    "MainDeliveryOption", "Description", "Specifications",
+    "MainPhotoLinks", "ReviewsPhotoLinks", "HostingFolderLink",
+]
+
+# Колонки Shopify CSV (у порядку полів get_shopify_one_item)
+SHOPIFY_COLUMNS = [
+    "Handle", "Title", "Body (HTML)", "Vendor", "Product Category", "Type", "Tags", "Published",
+    "Option1 Name", "Option1 Value", "Option2 Name", "Option2 Value", "Option3 Name", "Option3 Value",
+    "Variant SKU", "Variant Grams", "Variant Inventory Tracker", "Variant Inventory Qty",
+    "Variant Inventory Policy", "Variant Fulfillment Service", "Variant Price",
+    "Variant Compare At Price", "Variant Requires Shipping", "Variant Taxable", "Variant Barcode",
+    "Image Src", "Image Position", "Image Alt Text", "Gift Card", "SEO Title", "SEO Description",
+    "Google Shopping / Google Product Category", "Google Shopping / Gender",
+    "Google Shopping / Age Group", "Google Shopping / MPN", "Google Shopping / AdWords Grouping",
+    "Google Shopping / AdWords Labels", "Google Shopping / Condition",
+    "Google Shopping / Custom Product", "Google Shopping / Custom Label 0",
+    "Google Shopping / Custom Label 1", "Google Shopping / Custom Label 2",
+    "Google Shopping / Custom Label 3", "Google Shopping / Custom Label 4",
+    "Variant Image", "Variant Weight Unit", "Variant Tax Code", "Cost per item",
+    "Price / International", "Compare At Price / International", "Status",
+]
+
+
+class _StreamWriter:
+    """Базовий клас для поступового запису у файл або текстовий потік."""
+
+    def __init__(self, target):
+        if isinstance(target, str):
+            folder = os.path.dirname(target)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._file = open(target, "w", encoding="utf-8", newline="")
+            self._owns_file = True
+        else:
+            self._file = target
+            self._owns_file = False
+        self.count = 0
+
+    def close(self) -> None:
+        if self._owns_file and not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonStreamWriter(_StreamWriter):
+    """
+    Записує JSON масив товарів поступово, по одному елементу.
+
+    З single=True файл містить один об'єкт товару без масиву (як save_json
+    для одного товару).
+    """
+
+    def __init__(self, target, single: bool = False):
+        super().__init__(target)
+        self.single = single
+        if not single:
+            self._file.write("[")
+
+    def write(self, item: ItemRecord | dict) -> None:
+        """Додає один товар у масив."""
+        if isinstance(item, ItemRecord):
+            item = item.to_dict()
+        if self.single:
+            if self.count:
+                raise ValueError("У файл одного товару вже записано товар")
+            json.dump(item, self._file, ensure_ascii=False, indent=2)
+            self.count += 1
+            return
+        text = json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self._file.write(("," if self.count else "") + "\n  " + text)
+        self.count += 1
+
+    def close(self) -> None:
+        if not self._file.closed and not self.single:
+            self._file.write("\n]" if self.count else "]")
+        super().close()
+
+
+class CsvStreamWriter(_StreamWriter):
+    """Записує товари у CSV поступово, з фіксованим набором колонок."""
+
+    def __init__(self, target, columns: list[str] = ITEM_COLUMNS):
+        super().__init__(target)
+        self._writer = csv.DictWriter(
+            self._file, fieldnames=columns, extrasaction="ignore", lineterminator="\n"
+        )
+        self._writer.writeheader()
+
+    def write(self, item: ItemRecord | dict) -> None:
+        """Додає рядок товару (списки фото об'єднуються через кому)."""
+        if isinstance(item, ItemRecord):
+            self._writer.writerow(item.to_csv_row())
+            self.count += 1
+            return
+        self._writer.writerow({
+            key: ",".join(value) if isinstance(value, (list, tuple)) else value
+            for key, value in item.items()
+        })
+        self.count += 1
+
+
+class ShopifyCsvStreamWriter(CsvStreamWriter):
+    """Записує Shopify CSV поступово, нумеруючи товари в колонці Handle."""
+
+    def __init__(self, target):
+        super().__init__(target, columns=SHOPIFY_COLUMNS)
+
+    def write(self, product_rows: list[dict] | dict) -> None:
+        """Додає всі рядки (основний та рядки фото) одного товару."""
+        if isinstance(product_rows, dict):
+            product_rows = [product_rows]
+        self.count += 1
+        for row in product_rows:
+            self._writer.writerow({**row, "Handle": str(self.count)})
+
+
+class NdjsonStreamWriter(_StreamWriter):
+    """Записує товари у NDJSON (JSON Lines): один товар - один рядок."""
+
+    def write(self, item: ItemRecord | dict) -> None:
+        """Додає рядок товару."""
+        if isinstance(item, ItemRecord):
+            item = item.to_dict()
+        self._file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self.count += 1
+
+
+def _import_pyarrow():
+    """Імпортує pyarrow (необов'язкова залежність, потрібна лише для Parquet)."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Для експорту в Parquet потрібен пакет pyarrow: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def parquet_available() -> bool:
+    try:
+        _import_pyarrow()
+    except ImportError:
+        return False
+    return True
+
+
+def _to_int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetStreamWriter:
+    """
+    Записує товари у Parquet групами рядків по row_group_size товарів.
+
+    Колонки - ITEM_COLUMNS; списки фото та папок зберігаються як
+    колонки-списки (list<string>), а не рядки через кому, як у CSV.
+    У пам'яті одночасно знаходиться не більше однієї групи рядків.
+
+    Args:
+        target (str): Шлях до файлу
+        row_group_size (int): Кількість товарів в одній групі рядків
+    """
+
+    LIST_COLUMNS = ("MainPhotoLinks", "ReviewsPhotoLinks", "HostingFolderLink")
+
+    def __init__(self, target: str, row_group_size: int = config.PARQUET_ROW_GROUP_SIZE):
+        pa, pq = _import_pyarrow()
+        self._pa = pa
+        self.schema = pa.schema([
+            (column,
+             pa.list_(pa.string()) if column in self.LIST_COLUMNS
+             else pa.float64() if column == "Rating"
+             else pa.int64() if column == "Likes"
+             else pa.string())
+            for column in ITEM_COLUMNS
+        ])
+        folder = os.path.dirname(target)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._writer = pq.ParquetWriter(target, self.schema)
+        self.row_group_size = max(1, row_group_size)
+        self._columns = {column: [] for column in ITEM_COLUMNS}
+        self._buffered = 0
+        self.count = 0
+
+    def write(self, item: ItemRecord | dict) -> None:
+        """Додає один товар (група рядків записується, коли буфер заповнено)."""
+        if isinstance(item, ItemRecord):
+            item = item.to_dict()
+        for column, values in self._columns.items():
+            value = item.get(column)
+            if column in self.LIST_COLUMNS:
+                value = [str(v) for v in value] if value else []
+            elif column == "Rating":
+                value = _to_float(value)
+            elif column == "Likes":
+                value = _to_int(value)
+            elif value is not None:
+                value = str(value)
+            values.append(value)
+        self._buffered += 1
+        self.count += 1
+        if self._buffered >= self.row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffered:
+            return
+        self._writer.write_table(self._pa.Table.from_pydict(self._columns, schema=self.schema))
+        self._columns = {column: [] for column in ITEM_COLUMNS}
+        self._buffered = 0
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# Формати, пропущені через відсутність залежностей (попередження вже показано)
+_skipped_formats: set[str] = set()
+
+
+class ExportSink:
+    """
+    Поступово зберігає результати парсингу у JSON, CSV та Shopify CSV,
+    а також у додаткових форматах (NDJSON, Parquet).
+
+    Файли створюються при першому записаному товарі. Якщо для Parquet не
+    встановлено pyarrow, цей формат пропускається з попередженням у лозі.
+
+    Args:
+        base_path (str): Шлях до файлів без розширення
+        extra_formats: Додаткові формати ("ndjson", "parquet")
+        single (bool): Результат одного товару - JSON файл містить об'єкт, а не масив
+    """
+
+    # Додатковий формат -> (суфікс файлу, клас запису)
+    EXTRA_WRITERS = {
+        "ndjson": (".ndjson", NdjsonStreamWriter),
+        "parquet": (".parquet", ParquetStreamWriter),
+    }
+
+    def __init__(self, base_path: str, extra_formats=config.EXPORT_EXTRA_FORMATS, single: bool = False):
+        self.base_path = base_path
+        self.single = single
+        self.extra_formats = tuple(extra_formats)
+        self.count = 0
+        self.paths = []
+        self._writers = None
+        self._item_writers = []
+
+    def _open(self) -> None:
+        self._writers = (
+            JsonStreamWriter(f"{self.base_path}.json", single=self.single),
+            CsvStreamWriter(f"{self.base_path}.csv"),
+            ShopifyCsvStreamWriter(f"{self.base_path}_shopify.csv"),
+        )
+        self.paths = [f"{self.base_path}.json", f"{self.base_path}.csv", f"{self.base_path}_shopify.csv"]
+        self._item_writers = list(self._writers[:2])
+        for fmt in self.extra_formats:
+            if fmt not in self.EXTRA_WRITERS:
+                logging.warning(f"Невідомий формат результатів: {fmt}")
+                continue
+            suffix, writer_class = self.EXTRA_WRITERS[fmt]
+            try:
+                writer = writer_class(f"{self.base_path}{suffix}")
+            except ImportError as e:
+                # Попередження один раз на процес, а не для кожної задачі
+                if fmt not in _skipped_formats:
+                    _skipped_formats.add(fmt)
+                    logging.warning(f"Формат {fmt} пропущено: {e}")
+                continue
+            self._item_writers.append(writer)
+            self.paths.append(f"{self.base_path}{suffix}")
+
+    def write(self, item: ItemRecord | dict, shopify_rows: list[dict]) -> None:
+        """Додає один товар в усі файли."""
+        if self._writers is None:
+            self._open()
+        for writer in self._item_writers:
+            writer.write(item)
+        self._writers[2].write(shopify_rows)
+        self.count += 1
+
+    def close(self) -> None:
+        if self._writers is not None:
+            for writer in self._writers + tuple(self._item_writers[2:]):
+                writer.close()
+            logging.info(f"✅ Файли збережено: {self.base_path} ({self.count} товарів)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_json(data: ItemRecord | dict | list, filename: str) -> None:
     """Зберігає дані в JSON файл."""
     try:
-        with open(f"{filename}.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-            logging.info(f"✅ JSON файл збережено: {filename}.json")
+        if isinstance(data, ItemRecord):
+            data = data.to_dict()
+        if isinstance(data, dict):
+            with open(f"{filename}.json", "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        else:
+            with JsonStreamWriter(f"{filename}.json") as writer:
+                for item in data:
+                    writer.write(item)
+        logging.info(f"✅ JSON файл збережено: {filename}.json")
     except Exception as e:
         logging.error(f"Помилка при збереженні JSON: {e}")
         raise
 
 
-def save_csv(data: dict | list, filename: str) -> None:
+def save_csv(data: ItemRecord | dict | list, filename: str) -> None:
     """Зберігає дані в CSV файл."""
     try:
-        if isinstance(data, dict):
+        if isinstance(data, (ItemRecord, dict)):
             data = [data]
             
-        df = pd.DataFrame(data)
-        df.to_csv(f"{filename}.csv", index=False)
+        with CsvStreamWriter(f"{filename}.csv") as writer:
+            for item in data:
+                writer.write(item)
         logging.info(f"✅ CSV файл збережено: {filename}.csv")
     except Exception as e:
         logging.error(f"Помилка при збереженні CSV: {e}")
@@ -266,11 +629,8 @@ def save_csv(data: dict | list, filename: str) -> None:
 def save_shopify_csv_one_item(items: list[dict] | dict, filename: str) -> None:
     """Зберігає дані для Shopify (один товар) у CSV файл."""
     try:
-        if isinstance(items, dict):
-            items = [items]
-            
-        df = pd.DataFrame(items)
-        df.to_csv(f"{filename}_shopify.csv", index=False)
+        with ShopifyCsvStreamWriter(f"{filename}_shopify.csv") as writer:
+            writer.write(items)
         logging.info(f"✅ Shopify CSV файл збережено: {filename}_shopify.csv")
     except Exception as e:
         logging.error(f"Помилка при збереженні Shopify CSV: {e}")
@@ -280,45 +640,35 @@ def save_shopify_csv_one_item(items: list[dict] | dict, filename: str) -> None:
 def save_shopify_csv_list_items(items: list[list[dict]], filename: str) -> None:
     """Зберігає дані для Shopify у CSV файл."""
     try:
-        # Підготовка даних
-        all_items = []
-        count = 1
-        for product_items in items:
-            for item in product_items:
-                item["Handle"] = count
-                all_items.append(item)
-            count += 1
-            
-        # Збереження файлу
-        df = pd.DataFrame(all_items)
-        df.to_csv(f"{filename}_shopify.csv", index=False)
+        with ShopifyCsvStreamWriter(f"{filename}_shopify.csv") as writer:
+            for product_items in items:
+                writer.write(product_items)
         logging.info(f"✅ Shopify CSV файл збережено: {filename}_shopify.csv")
     except Exception as e:
         logging.error(f"Помилка при збереженні Shopify CSV: {e}")
         raise
 
 
-def prepare_json(data: dict | list) -> str:
+def prepare_json(data: ItemRecord | dict | list) -> str:
     """Готує JSON дані для відправки."""
+    if isinstance(data, ItemRecord):
+        data = data.to_dict()
+    elif isinstance(data, list):
+        data = [item.to_dict() if isinstance(item, ItemRecord) else item for item in data]
     return json.dumps(data, ensure_ascii=False, indent=2)
 
 
-def prepare_csv(data: dict | list) -> str:
+def prepare_csv(data: ItemRecord | dict | list) -> str:
     """Готує CSV дані для відправки."""
     try:
-        if isinstance(data, dict):
+        if isinstance(data, (ItemRecord, dict)):
             data = [data]
         
-        # Конвертуємо списки в рядки для фото
+        buffer = io.StringIO()
+        writer = CsvStreamWriter(buffer)
         for item in data:
-            if isinstance(item.get("MainPhotoLinks"), list):
-                item["MainPhotoLinks"] = ",".join(item["MainPhotoLinks"])
-            if isinstance(item.get("ReviewsPhotoLinks"), list):
-                item["ReviewsPhotoLinks"] = ",".join(item["ReviewsPhotoLinks"])
-            if isinstance(item.get("HostingFolderLink"), list):
-                item["HostingFolderLink"] = ",".join(item["HostingFolderLink"])
-        
-        return pd.DataFrame(data).to_csv(index=False, encoding='utf-8')
+            writer.write(item)
+        return buffer.getvalue()
     except Exception as e:
         print(f"Помилка при підготовці CSV: {e}")
         return ""
@@ -328,30 +678,16 @@ def prepare_shopify_csv(items: list[dict] | dict) -> str:
     """Готує Shopify CSV дані для відправки."""
     try:
         if isinstance(items, dict):
-            items = [items]
-        elif isinstance(items, list) and all(isinstance(i, list) for i in items):
-            # Якщо це список списків словників, об'єднуємо їх з правильними Handle
-            processed_items = []
-            count = 1
-            for product_items in items:
-                for item in product_items:
-                    item = item.copy()  # Створюємо копію щоб не змінювати оригінал
-                    item["Handle"] = str(count)
-                    processed_items.append(item)
-                count += 1
-            items = processed_items
-        else:
+            items = [[items]]
+        elif isinstance(items, list) and not all(isinstance(i, list) for i in items):
             # Якщо це простий список словників для одного товару
-            for item in items:
-                item = item.copy()
-                item["Handle"] = "1"
+            items = [items]
         
-        # Створюємо DataFrame і зберігаємо як CSV
-        df = pd.DataFrame(items)
-        # Переконуємося що Handle перший у колонках
-        cols = ['Handle'] + [col for col in df.columns if col != 'Handle']
-        df = df[cols]
-        return df.to_csv(index=False, encoding='utf-8')
+        buffer = io.StringIO()
+        writer = ShopifyCsvStreamWriter(buffer)
+        for product_items in items:
+            writer.write(product_items)
+        return buffer.getvalue()
     except Exception as e:
         print(f"Помилка при підготовці Shopify CSV: {e}")
         return ""
@@ -1,27 +1,123 @@
-import os
 import logging
-import cloudinary
-import cloudinary.uploader
-from cloudinary.exceptions import Error as CloudinaryError
-from dotenv import load_dotenv
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Завантаження змінних середовища
-load_dotenv()
+import config
+import metrics
+from upload_manifest import UploadManifest
 
 # Налаштування логування
 logger = logging.getLogger(__name__)
 
-# Налаштування Cloudinary з змінних середовища
-# https://console.cloudinary.com/settings/c-6f5534e46e74f613fa802f99963078/api-keys
+# Модуль cloudinary.uploader імпортується при першому завантаженні фото,
+# щоб не сповільнювати запуск бота
+_uploader = None
+_uploader_lock = threading.Lock()
 
-cloudinary.config(
-    cloud_name=os.getenv('CLOUD_NAME'),
-    api_key=os.getenv('API_KEY'),
-    api_secret=os.getenv('API_SECRET'),
-    secure=True
+
+def _get_uploader():
+    """Імпортує та налаштовує Cloudinary при першому зверненні."""
+    global _uploader
+    if _uploader is None:
+        with _uploader_lock:
+            if _uploader is None:
+                import cloudinary
+                import cloudinary.uploader
+
+                # Налаштування Cloudinary з змінних середовища
+                # https://console.cloudinary.com/settings/c-6f5534e46e74f613fa802f99963078/api-keys
+                cloudinary.config(
+                    cloud_name=config.CLOUD_NAME,
+                    api_key=config.CLOUDINARY_API_KEY,
+                    api_secret=config.CLOUDINARY_API_SECRET,
+                    secure=True
+                )
+                _uploader = cloudinary.uploader
+    return _uploader
+
+def set_uploader(uploader) -> None:
+    """
+    Замінює cloudinary.uploader іншим об'єктом (наприклад, заглушкою в бенчмарках).
+
+    Об'єкт має метод upload(photo_url, folder=..., **options), який повертає
+    словник з ключами url та public_id.
+    """
+    global _uploader
+    with _uploader_lock:
+        _uploader = uploader
+
+# Пул потоків для блокуючих викликів cloudinary.uploader.upload
+# (розмір пулу - максимальна кількість одночасних завантажень у Cloudinary)
+_upload_executor = ThreadPoolExecutor(max_workers=config.UPLOAD_CONCURRENCY, thread_name_prefix="cloudinary")
+
+# Маніфест уже завантажених фото
+upload_manifest = UploadManifest(
+    path=config.UPLOAD_MANIFEST_PATH,
+    max_age=config.UPLOAD_MANIFEST_MAX_AGE,
 )
 
-def upload_photos(item_info: dict) -> dict:
+
+def _upload_one(photo_url: str, folder: str) -> dict | None:
+    """Завантажує одне фото в Cloudinary (блокуючий виклик)."""
+    result = _get_uploader().upload(
+        photo_url,
+        folder=folder,
+        use_filename=True,
+        unique_filename=False
+    )
+    if result and "url" in result:
+        return result
+    return None
+
+
+async def upload_many(photo_urls: list[str], folder: str) -> tuple[list[str], int]:
+    """
+    Паралельно завантажує фото в одну папку Cloudinary.
+    
+    Фото, які вже є в маніфесті, не завантажуються повторно.
+    
+    Args:
+        photo_urls (list[str]): Посилання на фото
+        folder (str): Папка в Cloudinary
+        
+    Returns:
+        tuple[list[str], int]: URL фото у тому ж порядку (без невдалих)
+            та кількість фото, взятих з маніфесту
+    """
+    # Маніфест - SQLite, тому читання та запис виконуються в окремому потоці
+    known = await asyncio.to_thread(upload_manifest.get_many, photo_urls, folder)
+    # Унікальні фото, які вже є в маніфесті (повтори одного посилання не рахуються)
+    saved = len(known)
+    to_upload = [photo_url for photo_url in dict.fromkeys(photo_urls) if photo_url not in known]
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(loop.run_in_executor(_upload_executor, _upload_one, photo_url, folder) for photo_url in to_upload),
+        return_exceptions=True
+    )
+    uploaded_now = []
+    for photo_url, result in zip(to_upload, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Помилка завантаження фото {photo_url}: {result}")
+            metrics.UPLOADS.inc(1, "failed")
+        elif result:
+            logger.info(f"Завантажено фото: {result['url']}")
+            uploaded_now.append((photo_url, result["url"], result.get("public_id")))
+            known[photo_url] = result["url"]
+            metrics.UPLOADS.inc(1, "uploaded")
+        else:
+            metrics.UPLOADS.inc(1, "failed")
+    await asyncio.to_thread(upload_manifest.add_many, folder, uploaded_now)
+
+    uploaded = [known[photo_url] for photo_url in photo_urls if photo_url in known]
+    metrics.UPLOADS.inc(saved, "reused")
+    if saved:
+        logger.info(f"Пропущено повторне завантаження {saved} фото у {folder}")
+    return uploaded, saved
+
+
+async def upload_photos(item_info: dict) -> dict:
     """
     Завантажує фото в Cloudinary у відповідні папки.
     
@@ -29,9 +125,11 @@ def upload_photos(item_info: dict) -> dict:
         item_info (dict): Словник з інформацією про товар
         
     Returns:
-        dict: Словник з URL завантажених фото
+        dict: Словник з URL завантажених фото та кількістю фото,
+            для яких завантаження пропущено завдяки маніфесту (SavedUploads)
     """
-    uploaded_urls = {"MainPhotos": [], "PhotoReviews": []}
+    uploaded_urls = {"MainPhotos": [], "PhotoReviews": [], "SavedUploads": 0}
+    product_id = ""
     
     try:
         # Отримуємо посилання на фото
@@ -47,47 +145,20 @@ def upload_photos(item_info: dict) -> dict:
             "PhotoReviews": f"{product_id}/PhotoReviews"
         }
         
-        # Завантаження основних фото
-        if main_photos:
-            logger.info(f"Завантаження {len(main_photos)} основних фото")
-            for photo_url in main_photos:
-                try:
-                    result = cloudinary.uploader.upload(
-                        photo_url,
-                        folder=folders["MainPhotos"],
-                        use_filename=True,
-                        unique_filename=False
-                    )
-                    if result and "url" in result:
-                        uploaded_urls["MainPhotos"].append(result["url"])
-                        logger.info(f"Завантажено основне фото: {result['url']}")
-                except Exception as e:
-                    logger.error(f"Помилка завантаження основного фото: {e}")
-                    continue
-        
-        # Завантаження фото відгуків
-        if review_photos:
-            logger.info(f"Завантаження {len(review_photos)} фото відгуків")
-            for photo_url in review_photos:
-                try:
-                    result = cloudinary.uploader.upload(
-                        photo_url,
-                        folder=folders["PhotoReviews"],
-                        use_filename=True,
-                        unique_filename=False
-                    )
-                    if result and "url" in result:
-                        uploaded_urls["PhotoReviews"].append(result["url"])
-                        logger.info(f"Завантажено фото відгуку: {result['url']}")
-                except Exception as e:
-                    logger.error(f"Помилка завантаження фото відгуку: {e}")
-                    continue
+        logger.info(f"Завантаження {len(main_photos)} основних фото та {len(review_photos)} фото відгуків")
+        (main_urls, main_saved), (review_urls, review_saved) = await asyncio.gather(
+            upload_many(main_photos, folders["MainPhotos"]),
+            upload_many(review_photos, folders["PhotoReviews"])
+        )
+        uploaded_urls["MainPhotos"] = main_urls
+        uploaded_urls["PhotoReviews"] = review_urls
+        uploaded_urls["SavedUploads"] = main_saved + review_saved
                     
     except Exception as e:
         logger.error(f"Загальна помилка при завантаженні фото: {e}")
     
     # Формуємо посилання на папки
-    cloud_name = os.getenv('CLOUD_NAME')
+    cloud_name = config.CLOUD_NAME
     hosting_folder_links = [
         f"https://res.cloudinary.com/{cloud_name}/{product_id}/MainPhotos",
         f"https://res.cloudinary.com/{cloud_name}/{product_id}/PhotoReviews"
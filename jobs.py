@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Одна фонова задача користувача."""
+
+    def __init__(self, user_id: int, run: Callable[[], Awaitable], name: str = ""):
+        self.user_id = user_id
+        self.run = run
+        self.name = name
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+
+class JobQueue:
+    """
+    Черга фонових задач з фіксованим пулом воркерів.
+
+    Задачі розподіляються між користувачами по черзі (round-robin), і в кожного
+    користувача одночасно виконується не більше однієї задачі, тому велика задача
+    одного користувача не блокує інших.
+
+    Args:
+        workers (int): Кількість воркерів
+    """
+
+    def __init__(self, workers: int = 3):
+        self.workers = max(1, workers)
+        self._pending: dict[int, deque[Job]] = {}
+        self._ready: deque[int] = deque()
+        self._running: set[int] = set()
+        self._cond = asyncio.Condition()
+        self._tasks: list[asyncio.Task] = []
+        self._wait_times: deque[float] = deque(maxlen=100)
+
+    @property
+    def depth(self) -> int:
+        """Кількість задач, що очікують у черзі."""
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def position(self, user_id: int) -> int:
+        """Приблизна кількість задач інших користувачів, які будуть виконані раніше."""
+        if user_id in self._ready:
+            return list(self._ready).index(user_id)
+        return len(self._ready)
+
+    async def start(self) -> None:
+        """Запускає воркери."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Зупиняє воркери (задачі, що виконуються, скасовуються)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, user_id: int, run: Callable[[], Awaitable], name: str = "") -> Job:
+        """Додає задачу в чергу користувача."""
+        job = Job(user_id, run, name)
+        async with self._cond:
+            self._pending.setdefault(user_id, deque()).append(job)
+            if user_id not in self._running and user_id not in self._ready:
+                self._ready.append(user_id)
+                self._cond.notify()
+        logger.info(f"Задачу {name or ''} користувача {user_id} додано в чергу (у черзі: {self.depth})")
+        return job
+
+    def stats(self) -> dict:
+        """Повертає глибину черги та статистику часу очікування."""
+        waits = list(self._wait_times)
+        return {
+            "depth": self.depth,
+            "running": len(self._running),
+            "workers": self.workers,
+            "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+            "max_wait": max(waits) if waits else 0.0,
+        }
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: bool(self._ready))
+                user_id = self._ready.popleft()
+                job = self._pending[user_id].popleft()
+                self._running.add(user_id)
+
+            job.started_at = time.monotonic()
+            wait = job.started_at - job.enqueued_at
+            self._wait_times.append(wait)
+            logger.info(
+                f"Воркер {number}: старт задачі {job.name or ''} користувача {user_id} "
+                f"(очікування {wait:.1f} с, у черзі: {self.depth})"
+            )
+            try:
+                await job.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Помилка у фоновій задачі користувача {user_id}: {e}")
+            finally:
+                async with self._cond:
+                    self._running.discard(user_id)
+                    if self._pending.get(user_id):
+                        self._ready.append(user_id)
+                        self._cond.notify()
+                    else:
+                        self._pending.pop(user_id, None)
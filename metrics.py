@@ -0,0 +1,266 @@
+import bisect
+import contextvars
+import logging
+from contextlib import contextmanager
+from time import perf_counter
+
+import config
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Коли метрики вимкнено, inc/observe/timer одразу повертаються
+enabled = config.METRICS_ENABLED
+
+# Межі кошиків гістограм (секунди)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Усі створені метрики (для виводу в форматі Prometheus)
+_registry: list = []
+
+# Метрики поточної задачі парсингу (див. collect)
+_current_job: contextvars.ContextVar["JobMetrics | None"] = contextvars.ContextVar("job_metrics", default=None)
+
+
+class JobMetrics:
+    """Сума та кількість значень кожної метрики в межах однієї задачі."""
+
+    def __init__(self):
+        self.values: dict[tuple, list] = {}
+
+    def add(self, name: str, labels: tuple, value: float) -> None:
+        entry = self.values.get((name, labels))
+        if entry is None:
+            self.values[(name, labels)] = [1, value]
+        else:
+            entry[0] += 1
+            entry[1] += value
+
+    def count(self, name: str, *labels) -> float:
+        """Сума лічильника (для гістограми - кількість спостережень) за відповідними мітками."""
+        return sum(
+            total if name.endswith("_total") else count
+            for (metric, metric_labels), (count, total) in self.values.items()
+            if metric == name and metric_labels[:len(labels)] == labels
+        )
+
+    def seconds(self, name: str, *labels) -> float:
+        """Сумарний час гістограми за відповідними мітками."""
+        return sum(
+            total
+            for (metric, metric_labels), (_, total) in self.values.items()
+            if metric == name and metric_labels[:len(labels)] == labels
+        )
+
+    def summary(self) -> str:
+        """Короткий підсумок для логу задачі."""
+        stages = [
+            f"{labels[0]} {count}×{total / count:.3f} с"
+            for (name, labels), (count, total) in self.values.items()
+            if name == STAGE_SECONDS.name
+        ]
+        parts = []
+        if stages:
+            parts.append("етапи: " + ", ".join(stages))
+        parts.append(
+            f"API: запитів {self.count(API_REQUESTS.name):.0f} "
+            f"({self.seconds(API_REQUEST_SECONDS.name):.1f} с), "
+            f"429: {self.count(API_RATE_LIMITED.name):.0f}, "
+            f"повторів: {self.count(API_RETRIES.name):.0f}, "
+            f"об'єднано: {self.count(API_COALESCED.name):.0f}"
+        )
+        parts.append(f"очікування ліміту: {self.seconds(RATE_LIMIT_WAIT_SECONDS.name):.1f} с")
+        parts.append(
+            f"кеш: {self.count(CACHE_REQUESTS.name, 'hit'):.0f} влучань / "
+            f"{self.count(CACHE_REQUESTS.name, 'miss'):.0f} промахів"
+        )
+        parts.append(
+            f"фото: завантажено {self.count(UPLOADS.name, 'uploaded'):.0f}, "
+            f"повторно {self.count(UPLOADS.name, 'reused'):.0f}, "
+            f"помилок {self.count(UPLOADS.name, 'failed'):.0f}"
+        )
+        return "; ".join(parts)
+
+
+class Counter:
+    """
+    Лічильник з мітками.
+
+    Значення міток передаються позиційно в порядку labelnames.
+    Метрики оновлюються з циклу подій, тому блокування не використовуються.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        if not enabled:
+            return
+        self._values[labels] = self._values.get(labels, 0) + amount
+        job = _current_job.get()
+        if job is not None:
+            job.add(self.name, labels, amount)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Гістограма з мітками (кошики зберігаються некумулятивно, кумулюються при виводі)."""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # мітки -> [лічильники кошиків (+Inf останній), сума, кількість]
+        self._values: dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        if not enabled:
+            return
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+        job = _current_job.get()
+        if job is not None:
+            job.add(self.name, labels, value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class _Timer:
+    """Вимірює час блоку та записує його в гістограму."""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(perf_counter() - self.started, *self.labels)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timer(histogram: Histogram, *labels):
+    """Контекстний менеджер для вимірювання часу блоку (без витрат, якщо метрики вимкнено)."""
+    if not enabled:
+        return _NOOP_TIMER
+    return _Timer(histogram, labels)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+@contextmanager
+def collect():
+    """
+    Збирає метрики однієї задачі парсингу.
+
+    Усі задачі asyncio, створені всередині блоку, успадковують збирач,
+    тому паралельні задачі різних користувачів не змішуються.
+    Повертає JobMetrics або None, якщо метрики вимкнено.
+    """
+    if not enabled:
+        yield None
+        return
+    job = JobMetrics()
+    token = _current_job.set(job)
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+
+
+def render() -> str:
+    """Усі метрики у текстовому форматі Prometheus."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("parser_stage_seconds", "Час обробки товару на етапі конвеєра", ("stage",))
+RATE_LIMIT_WAIT_SECONDS = Histogram("parser_rate_limit_wait_seconds", "Очікування ліміту запитів до RapidAPI")
+API_REQUEST_SECONDS = Histogram("parser_api_request_seconds", "Тривалість запиту до RapidAPI", ("endpoint",))
+API_REQUESTS = Counter("parser_api_requests_total", "Запити до RapidAPI", ("endpoint", "status"))
+API_RATE_LIMITED = Counter("parser_api_rate_limited_total", "Відповіді 429 від RapidAPI", ("endpoint",))
+API_COALESCED = Counter("parser_api_coalesced_total", "Запити, об'єднані з однаковим запитом, що вже виконувався", ("endpoint",))
+API_RETRIES = Counter("parser_api_retries_total", "Повторні спроби запитів до RapidAPI", ("endpoint",))
+CACHE_REQUESTS = Counter("parser_cache_requests_total", "Звернення до кешу відповідей", ("result", "endpoint"))
+UPLOADS = Counter("parser_uploads_total", "Фото для Cloudinary", ("result",))
+
+
+# HTTP endpoint для Prometheus
+_runner = None
+
+
+async def start_server(host: str = config.METRICS_HOST, port: int = config.METRICS_PORT) -> None:
+    """Запускає локальний endpoint /metrics (якщо метрики увімкнено і порт заданий)."""
+    global _runner
+    if not enabled or not port or _runner is not None:
+        return
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, host, port).start()
+    logger.info(f"Метрики доступні на http://{host}:{port}/metrics")
+
+
+async def stop_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
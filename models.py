@@ -0,0 +1,127 @@
+import config
+
+
+class ItemRecord:
+    """
+    Компактний запис про товар (замість словника з get_item_info).
+
+    Атрибути зберігаються в __slots__, списки фото - у кортежах, а посилання на
+    папки Cloudinary обчислюються з ID товару, а не зберігаються в кожному записі.
+    Для сумісності запис підтримує доступ за ключами експорту
+    (record["Title"], record.get("MainPhotoLinks")).
+    """
+
+    # Відповідність ключів експорту (JSON/CSV) атрибутам запису
+    FIELDS = (
+        ("Link", "link"),
+        ("Title", "title"),
+        ("DiscountPrice", "discount_price"),
+        ("OriginalPrice", "original_price"),
+        ("Rating", "rating"),
+        ("Likes", "likes"),
+        ("MainDeliveryOption", "delivery_option"),
+        ("Description", "description"),
+        ("Specifications", "specifications"),
+        ("MainPhotoLinks", "main_photo_links"),
+        ("ReviewsPhotoLinks", "reviews_photo_links"),
+    )
+    _ATTRS = dict(FIELDS)
+    _PHOTO_ATTRS = ("main_photo_links", "reviews_photo_links")
+
+    __slots__ = ("product_id",) + tuple(attr for _, attr in FIELDS)
+
+    def __init__(self, product_id: str, link: str = "", title: str = "", discount_price: str = "",
+                 original_price: str = "", rating: float = 0.0, likes: int = 0, delivery_option: str = "",
+                 description: str = "", specifications: str = "", main_photo_links=(), reviews_photo_links=()):
+        self.product_id = str(product_id)
+        self.link = link
+        self.title = title
+        self.discount_price = discount_price
+        self.original_price = original_price
+        self.rating = rating
+        self.likes = likes
+        self.delivery_option = delivery_option
+        self.description = description
+        self.specifications = specifications
+        self.main_photo_links = tuple(main_photo_links)
+        self.reviews_photo_links = tuple(reviews_photo_links)
+
+    @property
+    def hosting_folder_links(self) -> list[str]:
+        """Посилання на папки товару в Cloudinary."""
+        return [
+            f"https://res.cloudinary.com/{config.CLOUD_NAME}/{self.product_id}/MainPhotos",
+            f"https://res.cloudinary.com/{config.CLOUD_NAME}/{self.product_id}/PhotoReviews"
+        ]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ItemRecord":
+        """Створює запис зі словника у форматі експорту або контрольної точки (з ProductId)."""
+        if "ProductId" in data:
+            product_id = data["ProductId"]
+        else:
+            # Контрольні точки, збережені до появи ProductId
+            product_id = data.get("Link", "").split("/")[-1].split(".")[0]
+        return cls(product_id, **{attr: data[key] for key, attr in cls.FIELDS if key in data})
+
+    def to_dict(self, with_product_id: bool = False) -> dict:
+        """
+        Повертає словник у форматі експорту (JSON).
+
+        З with_product_id словник містить і ProductId (для контрольних точок),
+        щоб from_dict не виводив ID з посилання.
+        """
+        data = {key: getattr(self, attr) for key, attr in self.FIELDS}
+        if with_product_id:
+            data["ProductId"] = self.product_id
+        data["MainPhotoLinks"] = list(self.main_photo_links)
+        data["ReviewsPhotoLinks"] = list(self.reviews_photo_links)
+        data["HostingFolderLink"] = self.hosting_folder_links
+        return data
+
+    def to_csv_row(self) -> dict:
+        """Повертає рядок CSV (списки об'єднуються через кому)."""
+        row = {key: getattr(self, attr) for key, attr in self.FIELDS}
+        row["MainPhotoLinks"] = ",".join(self.main_photo_links)
+        row["ReviewsPhotoLinks"] = ",".join(self.reviews_photo_links)
+        row["HostingFolderLink"] = ",".join(self.hosting_folder_links)
+        return row
+
+    # Доступ за ключами експорту, як у словнику
+    def __getitem__(self, key: str):
+        if key == "HostingFolderLink":
+            return self.hosting_folder_links
+        try:
+            return getattr(self, self._ATTRS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value) -> None:
+        attr = self._ATTRS[key]
+        setattr(self, attr, tuple(value) if attr in self._PHOTO_ATTRS else value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._ATTRS or key == "HostingFolderLink"
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> list[str]:
+        return [key for key, _ in self.FIELDS] + ["HostingFolderLink"]
+
+    def items(self):
+        return self.to_dict().items()
+
+    def copy(self) -> "ItemRecord":
+        return ItemRecord(self.product_id, **{attr: getattr(self, attr) for _, attr in self.FIELDS})
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ItemRecord):
+            return NotImplemented
+        return all(getattr(self, attr) == getattr(other, attr) for attr in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"ItemRecord(product_id={self.product_id!r}, title={self.title!r})"
@@ -0,0 +1,380 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable
+
+import config
+import metrics
+import ali_parse
+from data import get_item_info, get_shopify_one_item
+from hosting import upload_photos
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Маркер завершення потоку товарів між етапами
+_DONE = object()
+
+# Значення fetch_item для товару, який не потрібно обробляти далі (це не помилка)
+SKIP = object()
+
+# Пул процесів для get_item_info (створюється при першому використанні)
+_extract_executor = None
+_extract_processes = 0
+
+
+def get_extract_executor(processes: int) -> ProcessPoolExecutor:
+    """Повертає пул процесів заданого розміру для етапу extract."""
+    global _extract_executor, _extract_processes
+    if _extract_executor is None or _extract_processes != processes:
+        shutdown_extract_executor()
+        # spawn, а не fork: основний процес має потоки (Cloudinary, SQLite)
+        _extract_executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        _extract_processes = processes
+    return _extract_executor
+
+
+def shutdown_extract_executor() -> None:
+    """Зупиняє пул процесів етапу extract (якщо він був створений)."""
+    global _extract_executor, _extract_processes
+    if _extract_executor is not None:
+        _extract_executor.shutdown(wait=False, cancel_futures=True)
+        _extract_executor = None
+        _extract_processes = 0
+
+
+async def extract_record(item_data: tuple, processes: int = 0):
+    """
+    get_item_info для відповіді API: у циклі подій (processes=0) або в пулі процесів.
+
+    У процес передаються сирі відповіді API, назад повертається компактний ItemRecord,
+    тому розбір великих описів не затримує інші задачі та повідомлення бота.
+    """
+    if processes <= 0:
+        return get_item_info(item_data)
+    loop = asyncio.get_running_loop()
+    executor = get_extract_executor(processes)
+    try:
+        return await loop.run_in_executor(executor, get_item_info, item_data)
+    except BrokenProcessPool as e:
+        # Процес пулу аварійно завершився (наприклад, через нестачу пам'яті):
+        # пул створюється заново, а товар обробляється ще раз у новому пулі
+        logger.error(f"Пул процесів extract пошкоджено, створюємо новий: {e}")
+        if executor is _extract_executor:
+            shutdown_extract_executor()
+        return await loop.run_in_executor(get_extract_executor(processes), get_item_info, item_data)
+
+
+class Stage:
+    """
+    Один етап конвеєра.
+
+    Args:
+        name (str): Назва етапу (для логів та статистики)
+        handler: Асинхронна функція обробки; повертає товар для наступного
+            етапу або None, якщо товар далі не передається
+        concurrency (int): Кількість товарів, які етап обробляє одночасно
+    """
+
+    def __init__(self, name: str, handler: Callable[[object], Awaitable], concurrency: int = 1):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.processed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+
+
+class Pipeline:
+    """
+    Конвеєр з асинхронних етапів, з'єднаних обмеженими чергами.
+
+    Кожен етап має власну кількість одночасних обробників. Коли черга до
+    наступного етапу заповнена, етап чекає, тому повільний етап пригальмовує
+    попередні, а в пам'яті одночасно знаходиться обмежена кількість товарів.
+
+    Args:
+        stages (list[Stage]): Етапи в порядку обробки
+        queue_size (int): Розмір черги між етапами
+        on_error: async on_error(stage_name, item, error) - викликається,
+            коли обробка товару на етапі завершилась винятком
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = config.PIPELINE_QUEUE_SIZE, on_error=None):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.on_error = on_error
+
+    async def run(self, source) -> dict:
+        """
+        Пропускає через конвеєр усі елементи source (список або асинхронний ітератор).
+
+        Returns:
+            dict: Час виконання та статистика кожного етапу
+        """
+        started = time.monotonic()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [asyncio.create_task(self._feed(source, queues[0], self.stages[0].concurrency))]
+        for idx, stage in enumerate(self.stages):
+            is_last = idx == len(self.stages) - 1
+            outbox = None if is_last else queues[idx + 1]
+            next_workers = 0 if is_last else self.stages[idx + 1].concurrency
+            tasks.append(asyncio.create_task(self._run_stage(stage, queues[idx], outbox, next_workers)))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {
+            "elapsed": time.monotonic() - started,
+            "stages": {
+                stage.name: {
+                    "processed": stage.processed,
+                    "failed": stage.failed,
+                    "busy_time": stage.busy_time,
+                }
+                for stage in self.stages
+            },
+        }
+
+    async def _feed(self, source, inbox: asyncio.Queue, workers: int) -> None:
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await inbox.put(item)
+        else:
+            for item in source:
+                await inbox.put(item)
+        for _ in range(workers):
+            await inbox.put(_DONE)
+
+    async def _run_stage(self, stage: Stage, inbox: asyncio.Queue, outbox: asyncio.Queue | None,
+                         next_workers: int) -> None:
+        await asyncio.gather(*(self._worker(stage, inbox, outbox) for _ in range(stage.concurrency)))
+        for _ in range(next_workers):
+            await outbox.put(_DONE)
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: asyncio.Queue | None) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stage.failed += 1
+                logger.error(f"Помилка на етапі {stage.name}: {e}")
+                if self.on_error:
+                    await self.on_error(stage.name, item, e)
+                continue
+            finally:
+                elapsed = time.monotonic() - started
+                stage.busy_time += elapsed
+                metrics.STAGE_SECONDS.observe(elapsed, stage.name)
+
+            if result is None:
+                continue
+            stage.processed += 1
+            if outbox is not None:
+                await outbox.put(result)
+
+
+async def _numbered(source, window: asyncio.Semaphore):
+    """
+    Нумерує елементи списку або асинхронного ітератора: (номер, елемент).
+
+    Перед кожним елементом займається місце у window, тому одночасно
+    в обробці (включно з буфером упорядкування) не більше window елементів.
+    """
+    if hasattr(source, "__aiter__"):
+        seq = 0
+        async for item in source:
+            await window.acquire()
+            yield seq, item
+            seq += 1
+    else:
+        for seq, item in enumerate(source):
+            await window.acquire()
+            yield seq, item
+
+
+class PipelineItem:
+    """Товар, що проходить етапи конвеєра парсингу."""
+
+    __slots__ = ("seq", "item_id", "data", "record", "shopify_rows")
+
+    def __init__(self, seq: int, item_id: str):
+        self.seq = seq
+        self.item_id = str(item_id)
+        self.data = None
+        self.record = None
+        self.shopify_rows = None
+
+
+async def run_item_pipeline(headers: dict, items_id, sink, total: int | None = None,
+                            log_callback=None, progress_callback=None,
+                            fetch_concurrency: int = config.PIPELINE_FETCH_CONCURRENCY,
+                            upload_concurrency: int = config.PIPELINE_UPLOAD_CONCURRENCY,
+                            queue_size: int = config.PIPELINE_QUEUE_SIZE,
+                            extract_processes: int = config.EXTRACT_PROCESSES,
+                            fetch_item=None) -> dict:
+    """
+    Парсинг товарів конвеєром: отримання даних → get_item_info → завантаження
+    фото → дані для Shopify → запис у sink.
+
+    Отримання даних, завантаження фото та запис результатів виконуються
+    одночасно для різних товарів. Товари записуються в sink у порядку
+    items_id: готовий товар чекає в буфері, доки не будуть записані
+    (або пропущені) всі товари перед ним.
+
+    Args:
+        headers (dict): Заголовки запитів до RapidAPI
+        items_id: Список або асинхронний ітератор ID товарів
+        sink: Об'єкт з методом write(item, shopify_rows), наприклад ExportSink
+        total (int): Кількість товарів для повідомлень про прогрес
+        log_callback: async log_callback(text) для повідомлень про хід парсингу
+        progress_callback: async progress_callback(done, total) після кожного
+            обробленого (або пропущеного) товару
+        extract_processes (int): Кількість процесів для get_item_info
+            (0 - у циклі подій основного процесу)
+        fetch_item: async fetch_item(headers, item_id) замість ali_parse.parse_item;
+            може повернути SKIP, щоб пропустити товар без помилки
+
+    Returns:
+        dict: saved, failed, skipped, saved_uploads, coalesced (об'єднані однакові
+            запити до API за час задачі), elapsed та статистика етапів
+    """
+    if total is None:
+        total = len(items_id) if hasattr(items_id, "__len__") else 0
+    counters = {"fetched": 0, "saved": 0, "failed": 0, "skipped": 0, "saved_uploads": 0}
+
+    async def log(text: str):
+        logger.info(text)
+        if log_callback:
+            await log_callback(text)
+
+    async def item_done(result: str):
+        counters[result] += 1
+        if progress_callback:
+            await progress_callback(counters["saved"] + counters["failed"] + counters["skipped"], total)
+
+    # Буфер для запису в порядку items_id: номер товару -> товар (None - пропущений).
+    # Розмір обмежено вікном window (див. нижче), тому навіть якщо один товар
+    # довго чекає (429, повільне завантаження фото), пам'ять не росте
+    pending: dict[int, PipelineItem | None] = {}
+    next_seq = 0
+
+    async def release(seq: int, item: PipelineItem | None = None):
+        """Позначає товар завершеним і записує всі готові товари по порядку."""
+        nonlocal next_seq
+        pending[seq] = item
+        while next_seq in pending:
+            ready = pending.pop(next_seq)
+            next_seq += 1
+            window.release()
+            if ready is None:
+                continue
+            try:
+                sink.write(ready.record, ready.shopify_rows)
+            except Exception as e:
+                logger.error(f"Помилка на етапі sink: {e}")
+                await log(f"❌ Помилка обробки товару {ready.item_id} (sink): {e}")
+                await item_done("failed")
+                continue
+            await log(f"✅ Товар {ready.item_id} успішно оброблено")
+            await item_done("saved")
+
+    async def item_failed(seq: int, result: str = "failed"):
+        await item_done(result)
+        await release(seq)
+
+    async def fetch(entry) -> PipelineItem | None:
+        item = PipelineItem(*entry)
+        item.data = await (fetch_item or ali_parse.parse_item)(headers, item.item_id)
+        counters["fetched"] += 1
+        if item.data is SKIP:
+            await item_failed(item.seq, "skipped")
+            return None
+        if not item.data:
+            await log(f"⚠️ Пропущено товар {item.item_id}: помилка отримання даних")
+            await item_failed(item.seq)
+            return None
+        await log(f"📥 Отримано дані товарів: {counters['fetched']}/{total or '?'}")
+        return item
+
+    async def extract(item: PipelineItem) -> PipelineItem | None:
+        item.record = await extract_record(item.data, extract_processes)
+        item.data = None
+        if item.record is None:
+            await log(f"⚠️ Пропущено товар {item.item_id}: некоректні дані")
+            await item_failed(item.seq)
+            return None
+        return item
+
+    async def upload(item: PipelineItem) -> PipelineItem:
+        uploaded_urls = await upload_photos(item.record)
+        counters["saved_uploads"] += uploaded_urls.get("SavedUploads", 0)
+        item.record["MainPhotoLinks"] = uploaded_urls.get("MainPhotos", [])
+        item.record["ReviewsPhotoLinks"] = uploaded_urls.get("PhotoReviews", [])
+        return item
+
+    async def shopify(item: PipelineItem) -> PipelineItem:
+        item.shopify_rows = get_shopify_one_item(item.record, list(item.record["MainPhotoLinks"]))
+        return item
+
+    async def write(item: PipelineItem) -> PipelineItem:
+        await release(item.seq, item)
+        return item
+
+    async def on_error(stage_name: str, item, error: Exception):
+        # На етапі fetch item - це ще пара (номер, ID товару)
+        seq, item_id = (item.seq, item.item_id) if isinstance(item, PipelineItem) else item
+        await log(f"❌ Помилка обробки товару {item_id} ({stage_name}): {error}")
+        await item_failed(seq)
+
+    pipeline = Pipeline(
+        [
+            Stage("fetch", fetch, fetch_concurrency),
+            Stage("extract", extract, max(1, extract_processes)),
+            Stage("upload", upload, upload_concurrency),
+            Stage("shopify", shopify),
+            Stage("sink", write),
+        ],
+        queue_size=queue_size,
+        on_error=on_error,
+    )
+    # Вікно упорядкування: стільки товарів, скільки вміщують черги та обробники
+    # етапів, тобто без затримки товар чекає в буфері не довше, ніж у конвеєрі
+    window = asyncio.Semaphore(
+        pipeline.queue_size * len(pipeline.stages) + sum(stage.concurrency for stage in pipeline.stages)
+    )
+    coalesced_before = ali_parse.coalesced_requests
+    with metrics.collect() as job_metrics:
+        stats = await pipeline.run(_numbered(items_id, window))
+    stats.update(
+        saved=counters["saved"],
+        failed=counters["failed"],
+        skipped=counters["skipped"],
+        saved_uploads=counters["saved_uploads"],
+        # Разом із задачами, що виконувались одночасно з цією
+        coalesced=ali_parse.coalesced_requests - coalesced_before,
+        metrics=job_metrics.summary() if job_metrics else "",
+    )
+    logger.info(
+        f"Конвеєр завершено за {stats['elapsed']:.1f} с: "
+        f"збережено {stats['saved']}, пропущено {stats['failed']}, "
+        f"об'єднано однакових запитів до API: {stats['coalesced']}"
+    )
+    if stats["metrics"]:
+        logger.info(f"Метрики задачі: {stats['metrics']}")
+    return stats
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Максимальна довжина тексту повідомлення Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+
+class ProgressReporter:
+    """
+    Показує хід парсингу в одному повідомленні Telegram.
+
+    Рядки збираються у буфер фіксованого розміру, а повідомлення редагується
+    у фоні не частіше ніж раз на interval секунд, тому виклик не блокує парсинг.
+    Об'єкт можна передавати як log_callback (await reporter(text)).
+
+    Args:
+        message (types.Message): Повідомлення, яке редагується
+        interval (float): Мінімальний інтервал між редагуваннями в секундах
+        max_lines (int): Кількість останніх рядків, які показуються
+    """
+
+    def __init__(self, message, interval: float = 2.0, max_lines: int = 20):
+        self.message = message
+        self.interval = interval
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self._last_flush = 0.0
+        self._dirty = False
+        self._closed = False
+        self._task: asyncio.Task | None = None
+
+    async def __call__(self, text: str) -> None:
+        """Додає рядок; повідомлення оновиться під час найближчого скидання."""
+        if self._closed:
+            return
+        self.lines.append(text)
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        # Рядки, додані під час edit_text, показуються наступним оновленням
+        while self._dirty and not self._closed:
+            delay = self._last_flush + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Негайно оновлює повідомлення, якщо є нові рядки."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        text = "\n".join(self.lines)[-MAX_MESSAGE_LENGTH:]
+        try:
+            await self.message.edit_text(text)
+        except Exception as e:
+            if "message is not modified" not in str(e):
+                logger.error(f"Помилка оновлення статусу: {e}")
+
+    async def _stop(self) -> None:
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Зупиняє фонові оновлення та показує останні рядки."""
+        await self._stop()
+        await self.flush()
+
+    async def finish(self, text: str, **kwargs) -> None:
+        """Зупиняє фонові оновлення та замінює повідомлення підсумковим текстом."""
+        await self._stop()
+        try:
+            await self.message.edit_text(text, **kwargs)
+            return
+        except Exception as e:
+            logger.error(f"Помилка оновлення статусу: {e}")
+        # Повідомлення статусу могли видалити - надсилаємо підсумок окремим повідомленням
+        try:
+            await self.message.answer(text, **kwargs)
+        except Exception as e:
+            logger.error(f"Помилка надсилання підсумку: {e}")
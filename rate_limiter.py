@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+class DailyLimitExceeded(Exception):
+    """Вичерпано денний ліміт запитів до API."""
+
+
+class RateLimiter:
+    """
+    Глобальний token bucket для запитів до RapidAPI.
+
+    Args:
+        rate_per_second (float): Кількість запитів на секунду
+        per_day (int): Денний ліміт запитів (0 - без обмеження)
+        burst (int): Максимальна кількість запитів, що можуть піти одночасно
+        usage_path (str): База SQLite для лічильника денного ліміту. Лічильник
+            спільний для всіх процесів (бот, CLI, GUI) і не скидається після
+            перезапуску; без usage_path запити рахуються лише в цьому процесі
+    """
+
+    def __init__(self, rate_per_second: float, per_day: int = 0, burst: int = 1,
+                 usage_path: str | None = None):
+        self.rate_per_second = rate_per_second
+        self.per_day = per_day
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._day = self._today()
+        self._day_count = 0
+        self.usage_path = usage_path
+        self._conn = None
+        # Лічильник у базі оновлюється в потоках (asyncio.to_thread)
+        self._usage_lock = threading.Lock()
+        # asyncio.Lock прив'язується до циклу подій, тому для кожного циклу
+        # (наприклад, кожного asyncio.run у GUI) створюється власне блокування
+        self._lock: asyncio.Lock | None = None
+        self._lock_loop = None
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _refill(self, now: float) -> None:
+        """Поповнює bucket відповідно до часу, що минув."""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def _connect(self) -> sqlite3.Connection:
+        """Відкриває базу лічильника при першому зверненні."""
+        if self._conn is None:
+            folder = os.path.dirname(self.usage_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.usage_path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS api_usage (day TEXT PRIMARY KEY, count INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _take_daily_stored(self, today: str) -> bool:
+        """Атомарно збільшує лічильник у базі; False - ліміт вичерпано."""
+        conn = self._connect()
+        conn.execute("INSERT OR IGNORE INTO api_usage (day, count) VALUES (?, 0)", (today,))
+        taken = conn.execute(
+            "UPDATE api_usage SET count = count + 1 WHERE day = ? AND (? = 0 OR count < ?)",
+            (today, self.per_day, self.per_day)
+        ).rowcount
+        conn.commit()
+        self._day_count = conn.execute("SELECT count FROM api_usage WHERE day = ?", (today,)).fetchone()[0]
+        return bool(taken)
+
+    def _take_daily(self) -> None:
+        """Враховує запит у денному ліміті."""
+        with self._usage_lock:
+            today = self._today()
+            if today != self._day:
+                self._day = today
+                self._day_count = 0
+            if self.usage_path:
+                try:
+                    if not self._take_daily_stored(today):
+                        raise DailyLimitExceeded(f"Вичерпано денний ліміт запитів ({self.per_day})")
+                    return
+                except sqlite3.Error as e:
+                    logger.error(f"Помилка лічильника денного ліміту: {e}")
+            if self.per_day and self._day_count >= self.per_day:
+                raise DailyLimitExceeded(f"Вичерпано денний ліміт запитів ({self.per_day})")
+            self._day_count += 1
+
+    @property
+    def used_today(self) -> int:
+        """Кількість запитів, використаних сьогодні (з урахуванням інших процесів, якщо задано usage_path)."""
+        today = self._today()
+        if self.usage_path:
+            try:
+                with self._usage_lock:
+                    row = self._connect().execute("SELECT count FROM api_usage WHERE day = ?", (today,)).fetchone()
+                return row[0] if row else 0
+            except sqlite3.Error as e:
+                logger.error(f"Помилка лічильника денного ліміту: {e}")
+        return self._day_count if self._day == today else 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def acquire(self) -> None:
+        """Чекає, доки можна буде виконати наступний запит."""
+        async with self._get_lock():
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    if not self.usage_path:
+                        self._take_daily()
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+        if self.usage_path:
+            # Запис лічильника в базу (з commit) - в окремому потоці і без
+            # блокування, щоб інші запити не чекали на диск
+            await asyncio.to_thread(self._take_daily)
+
+    def pause(self, seconds: float) -> None:
+        """Призупиняє всі запити на вказану кількість секунд (наприклад, після 429)."""
+        paused_until = time.monotonic() + seconds
+        if paused_until > self._paused_until:
+            logger.warning(f"Запити до API призупинено на {seconds} с")
+            self._paused_until = paused_until
+            self._tokens = 0.0
+            self._updated = paused_until
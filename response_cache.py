@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Дисковий кеш відповідей RapidAPI на основі SQLite.
+
+    Args:
+        path (str): Шлях до файлу бази даних
+        ttl (dict): Час життя записів у секундах для кожного endpoint (0 - не кешувати)
+        max_entries (int): Максимальна кількість записів, після якої видаляються найдавніше використані
+
+    Час останнього використання записів (для LRU) оновлюється не при кожному
+    влучанні, а пакетами: разом з наступним записом у кеш або після
+    ACCESS_FLUSH_SIZE влучань, щоб не робити commit на кожен запит.
+    """
+
+    # Кількість влучань, після якої час використання записується в базу
+    ACCESS_FLUSH_SIZE = 100
+
+    def __init__(self, path: str, ttl: dict[str, int], max_entries: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+        # ключ -> час останнього влучання, ще не записаний у базу
+        self._accessed: dict[str, float] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        """Відкриває базу даних при першому зверненні."""
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, data TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict) -> str:
+        """Формує ключ з назви endpoint та нормалізованих параметрів."""
+        normalized = {str(k): str(v).strip() for k, v in (params or {}).items()}
+        return f"{endpoint}?{json.dumps(normalized, sort_keys=True, ensure_ascii=False)}"
+
+    def enabled_for(self, endpoint: str) -> bool:
+        return self.ttl.get(endpoint, 0) > 0
+
+    def get(self, endpoint: str, params: dict) -> dict | None:
+        """Повертає збережену відповідь або None, якщо її немає чи вона застаріла."""
+        if not self.enabled_for(endpoint):
+            return None
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT data, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] < self.ttl[endpoint]:
+                    self._accessed[key] = now
+                    if len(self._accessed) >= self.ACCESS_FLUSH_SIZE:
+                        self._flush_accessed(conn)
+                        conn.commit()
+                    self.hits += 1
+                    return json.loads(row[0])
+                # Застарілий запис буде замінено в set або видалено як найдавніший
+        except sqlite3.Error as e:
+            logger.error(f"Помилка читання кешу: {e}")
+        self.misses += 1
+        return None
+
+    def _flush_accessed(self, conn: sqlite3.Connection) -> None:
+        """Записує накопичені часи використання (без commit; викликається під блокуванням)."""
+        if self._accessed:
+            conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def set(self, endpoint: str, params: dict, data: dict) -> None:
+        """Зберігає відповідь та видаляє зайві записи за принципом LRU."""
+        if not self.enabled_for(endpoint):
+            return
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                self._flush_accessed(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, endpoint, data, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, endpoint, json.dumps(data, ensure_ascii=False), now, now)
+                )
+                excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+                        (excess,)
+                    )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка запису в кеш: {e}")
+
+    def invalidate(self, endpoint: str | None = None) -> None:
+        """Видаляє всі записи (або записи одного endpoint)."""
+        with self._lock:
+            conn = self._connect()
+            if endpoint:
+                conn.execute("DELETE FROM responses WHERE endpoint = ?", (endpoint,))
+            else:
+                conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self) -> dict:
+        """Повертає лічильники влучань та промахів."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._flush_accessed(self._conn)
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Помилка запису в кеш: {e}")
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,37 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import clean_description  # noqa: E402
+
+
+class CleanDescriptionTagsTest(unittest.TestCase):
+    """Видалення тегів шаблоном <[^<>]*>: тег не може містити інший "<"."""
+
+    def clean(self, html: str) -> str:
+        return clean_description(html, is_html=True)
+
+    def test_regular_tags(self):
+        self.assertEqual(self.clean("<div><span>Hi</span> &amp; bye</div>"), "Hi & bye")
+
+    def test_stray_less_than_is_kept(self):
+        # "<" без ">" до наступного тегу - це текст, а не початок тегу
+        self.assertEqual(self.clean("a < b <i>x</i> c"), "a < b x c")
+
+    def test_unclosed_tag_at_end_is_kept(self):
+        self.assertEqual(self.clean("<p>text <br"), "text <br")
+
+    def test_nested_less_than(self):
+        # Видаляється лише внутрішній тег, зовнішні дужки лишаються текстом
+        self.assertEqual(self.clean("<<b>>bold"), "<>bold")
+        self.assertEqual(self.clean('x <a href="<y>">link</a>'), 'x <a href="">link')
+
+    def test_comparison_between_tags(self):
+        # Текст між "<" та ">" без іншого "<" вважається тегом, як і раніше
+        self.assertEqual(self.clean("1 < 2 and 3 > 2"), "1 2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import DailyLimitExceeded, RateLimiter  # noqa: E402
+
+
+class RateLimiterEventLoopTest(unittest.TestCase):
+    """Один RateLimiter використовується в кількох asyncio.run (як у GUI)."""
+
+    async def _acquire_concurrently(self, limiter: RateLimiter, count: int) -> None:
+        # Одночасні acquire змушують задачі чекати на блокування
+        await asyncio.gather(*(limiter.acquire() for _ in range(count)))
+
+    def test_acquire_in_second_event_loop(self):
+        limiter = RateLimiter(rate_per_second=200, burst=1)
+        asyncio.run(self._acquire_concurrently(limiter, 4))
+        asyncio.run(self._acquire_concurrently(limiter, 4))
+        self.assertEqual(limiter.used_today, 8)
+
+
+class RateLimiterDailyUsageTest(unittest.TestCase):
+    """Денний ліміт зберігається в базі та спільний для кількох процесів."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "api_usage.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_daily_limit_survives_restart(self):
+        first = RateLimiter(rate_per_second=1000, per_day=3, burst=3, usage_path=self.path)
+        asyncio.run(first.acquire())
+        asyncio.run(first.acquire())
+
+        # Новий процес (або перезапуск) бачить уже використані запити
+        second = RateLimiter(rate_per_second=1000, per_day=3, burst=3, usage_path=self.path)
+        self.assertEqual(second.used_today, 2)
+        asyncio.run(second.acquire())
+        with self.assertRaises(DailyLimitExceeded):
+            asyncio.run(second.acquire())
+        with self.assertRaises(DailyLimitExceeded):
+            asyncio.run(first.acquire())
+        self.assertEqual(first.used_today, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+class UploadManifest:
+    """
+    Маніфест завантажених у Cloudinary фото на основі SQLite.
+
+    Зберігає відповідність "посилання на фото AliExpress + папка" -> URL та public_id
+    у Cloudinary, щоб не завантажувати те саме фото повторно.
+
+    Args:
+        path (str): Шлях до файлу бази даних
+        max_age (int): Максимальний вік запису в секундах (0 - без обмеження)
+    """
+
+    def __init__(self, path: str, max_age: int = 0):
+        self.path = path
+        self.max_age = max_age
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Відкриває базу даних при першому зверненні."""
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "source_url TEXT NOT NULL, folder TEXT NOT NULL, url TEXT NOT NULL, "
+                "public_id TEXT, created REAL NOT NULL, PRIMARY KEY (source_url, folder))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_many(self, source_urls: list[str], folder: str) -> dict[str, str]:
+        """Повертає вже завантажені фото у вигляді {посилання на джерело: URL у Cloudinary}."""
+        if not source_urls:
+            return {}
+        found = {}
+        min_created = time.time() - self.max_age if self.max_age else 0
+        try:
+            with self._lock:
+                conn = self._connect()
+                placeholders = ",".join("?" * len(source_urls))
+                rows = conn.execute(
+                    f"SELECT source_url, url FROM uploads WHERE folder = ? AND created >= ? "
+                    f"AND source_url IN ({placeholders})",
+                    (folder, min_created, *source_urls)
+                ).fetchall()
+                found = dict(rows)
+        except sqlite3.Error as e:
+            logger.error(f"Помилка читання маніфесту завантажень: {e}")
+        return found
+
+    def add(self, source_url: str, folder: str, url: str, public_id: str | None = None) -> None:
+        """Записує завантажене фото в маніфест."""
+        self.add_many(folder, [(source_url, url, public_id)])
+
+    def add_many(self, folder: str, uploads: list[tuple[str, str, str | None]]) -> None:
+        """Записує в маніфест кілька фото однієї папки одним комітом.
+
+        Args:
+            folder (str): Папка в Cloudinary
+            uploads (list): (посилання на джерело, URL у Cloudinary, public_id)
+        """
+        if not uploads:
+            return
+        created = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO uploads (source_url, folder, url, public_id, created) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(source_url, folder, url, public_id, created) for source_url, url, public_id in uploads]
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка запису в маніфест завантажень: {e}")
+
+    def invalidate(self, source_url: str | None = None, folder_prefix: str | None = None) -> int:
+        """
+        Видаляє записи з маніфесту, щоб фото завантажились знову.
+
+        Без аргументів очищає весь маніфест. Повертає кількість видалених записів.
+        """
+        with self._lock:
+            conn = self._connect()
+            query = "DELETE FROM uploads WHERE 1 = 1"
+            params = []
+            if source_url:
+                query += " AND source_url = ?"
+                params.append(source_url)
+            if folder_prefix:
+                query += " AND folder LIKE ?"
+                params.append(f"{folder_prefix}%")
+            deleted = conn.execute(query, params).rowcount
+            conn.commit()
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
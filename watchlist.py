@@ -0,0 +1,266 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import ali_parse
+from data import NdjsonStreamWriter
+from models import ItemRecord
+from pipeline import SKIP, run_item_pipeline
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Поля, зміни яких відстежуються
+WATCH_FIELDS = ("DiscountPrice", "OriginalPrice", "Rating", "Likes")
+
+
+def _normalize(discount_price, original_price, rating, likes) -> dict:
+    """Приводить значення до одних типів, щоб знімки з API та з бази можна було порівнювати."""
+    likes = str(likes)
+    return {
+        "DiscountPrice": str(discount_price or ""),
+        "OriginalPrice": str(original_price or ""),
+        "Rating": float(rating),
+        "Likes": int(likes) if likes.isdigit() else likes,
+    }
+
+
+def snapshot_from_detail(item: dict) -> dict | None:
+    """Повертає відстежувані поля з відповіді item_detail_7 (як у get_item_info)."""
+    try:
+        result = item["result"]
+        sku = result["item"].get("sku", {}).get("def", {})
+        return _normalize(
+            sku.get("promotionPrice", ""),
+            sku.get("price", ""),
+            result["reviews"]["averageStar"],
+            result["item"]["wishCount"],
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Некоректні дані товару для відстеження: {e}")
+        return None
+
+
+def snapshot_from_record(item: ItemRecord | dict) -> dict:
+    return _normalize(*(item[field] for field in WATCH_FIELDS))
+
+
+def diff_snapshots(old: dict | None, new: dict) -> dict:
+    """Повертає змінені поля: {поле: (старе значення, нове значення)}."""
+    old = old or {}
+    return {
+        field: (old.get(field), new[field])
+        for field in WATCH_FIELDS
+        if old.get(field) != new[field]
+    }
+
+
+class WatchStore:
+    """
+    Список відстежуваних товарів з останніми відомими значеннями WATCH_FIELDS (SQLite).
+
+    Args:
+        path (str): Шлях до файлу бази даних
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Відкриває базу даних при першому зверненні."""
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS watch_items ("
+                "item_id TEXT PRIMARY KEY, discount_price TEXT, original_price TEXT, "
+                "rating REAL, likes TEXT, checked REAL NOT NULL DEFAULT 0, changed REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS watch_items_checked ON watch_items (checked)")
+            self._conn.commit()
+        return self._conn
+
+    def add(self, items_id: list[str]) -> int:
+        """Додає товари до списку (вже наявні не змінюються). Повертає кількість нових."""
+        with self._lock:
+            conn = self._connect()
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO watch_items (item_id) VALUES (?)",
+                [(str(item_id),) for item_id in items_id]
+            )
+            conn.commit()
+            return conn.total_changes - before
+
+    def remove(self, items_id: list[str]) -> int:
+        with self._lock:
+            conn = self._connect()
+            before = conn.total_changes
+            conn.executemany("DELETE FROM watch_items WHERE item_id = ?", [(str(item_id),) for item_id in items_id])
+            conn.commit()
+            return conn.total_changes - before
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM watch_items").fetchone()[0]
+
+    def due(self, interval: float, limit: int = 0, now: float | None = None) -> list[str]:
+        """Повертає товари, які не перевірялися довше interval секунд (найдавніші першими)."""
+        now = time.time() if now is None else now
+        query = "SELECT item_id FROM watch_items WHERE checked <= ? ORDER BY checked"
+        params = [now - interval]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+        return [item_id for (item_id,) in rows]
+
+    def get(self, item_id: str) -> dict | None:
+        """Повертає останній знімок товару або None, якщо товар ще не перевірявся."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT discount_price, original_price, rating, likes, changed "
+                "FROM watch_items WHERE item_id = ?",
+                (str(item_id),)
+            ).fetchone()
+        if row is None or row[4] is None:
+            return None
+        return _normalize(*row[:4])
+
+    def touch(self, item_id: str, checked: float | None = None) -> None:
+        """Позначає товар перевіреним без змін."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE watch_items SET checked = ? WHERE item_id = ?",
+                (time.time() if checked is None else checked, str(item_id))
+            )
+            conn.commit()
+
+    def update(self, item_id: str, snapshot: dict, checked: float | None = None) -> None:
+        """Зберігає новий знімок товару."""
+        checked = time.time() if checked is None else checked
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO watch_items (item_id, discount_price, original_price, rating, likes, checked, changed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(item_id) DO UPDATE SET discount_price = excluded.discount_price, "
+                "original_price = excluded.original_price, rating = excluded.rating, "
+                "likes = excluded.likes, checked = excluded.checked, changed = excluded.changed",
+                (str(item_id), snapshot["DiscountPrice"], snapshot["OriginalPrice"],
+                 snapshot["Rating"], str(snapshot["Likes"]), checked, checked)
+            )
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class WatchSink:
+    """
+    Обгортка над ExportSink для відстеження: після запису товару зберігає
+    його новий знімок і додає зміни у файл <base>_changes.ndjson.
+    """
+
+    def __init__(self, sink, store: WatchStore, changes: dict, changes_path: str):
+        self.sink = sink
+        self.store = store
+        self.changes = changes
+        self.changes_path = changes_path
+        self.changed = []
+        self._writer = None
+
+    @property
+    def count(self) -> int:
+        return self.sink.count
+
+    def write(self, item: ItemRecord, shopify_rows: list[dict]) -> None:
+        self.sink.write(item, shopify_rows)
+        item_id = str(item.product_id)
+        snapshot = snapshot_from_record(item)
+        self.store.update(item_id, snapshot)
+        is_new, fields = self.changes.pop(item_id, (True, diff_snapshots(None, snapshot)))
+        entry = {
+            "ItemId": item_id,
+            "Link": item["Link"],
+            "Title": item["Title"],
+            "New": is_new,
+            "Changes": {field: {"old": old, "new": new} for field, (old, new) in fields.items()},
+            "Checked": datetime.now().isoformat(timespec="seconds"),
+        }
+        if self._writer is None:
+            self._writer = NdjsonStreamWriter(self.changes_path)
+        self._writer.write(entry)
+        self.changed.append(entry)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+async def run_watch(headers: dict, store: WatchStore, sink, changes_path: str, interval: float,
+                    limit: int = 0, log_callback=None, progress_callback=None, **pipeline_options) -> dict:
+    """
+    Повторна перевірка товарів зі списку відстеження.
+
+    Для кожного товару, у якого минув інтервал перевірки, запитується лише
+    item_detail_7 (без кешу відповідей). Якщо відстежувані поля не змінилися,
+    товар позначається перевіреним і далі не обробляється - відгуки та фото
+    не запитуються. Змінені та нові товари проходять звичайний конвеєр
+    (відгуки, фото, Shopify) і записуються в sink, а зміни - у changes_path.
+
+    Returns:
+        dict: Статистика run_item_pipeline, а також checked, unchanged та changed
+            (список змін для кожного записаного товару)
+    """
+    items_id = store.due(interval, limit)
+    changes = {}
+
+    async def fetch_item(headers: dict, item_id: str):
+        detail = await ali_parse.parse_item_detail(headers, item_id, use_cache=False)
+        if ali_parse.is_error_response(detail):
+            return None
+        snapshot = snapshot_from_detail(detail)
+        if snapshot is None:
+            return None
+        old = store.get(item_id)
+        diff = diff_snapshots(old, snapshot)
+        if old is not None and not diff:
+            store.touch(item_id)
+            return SKIP
+        changes[item_id] = (old is None, diff)
+        reviews = await ali_parse.parse_item_reviews(headers, item_id)
+        if ali_parse.is_error_response(reviews):
+            reviews = None
+        return detail, reviews
+
+    watch_sink = WatchSink(sink, store, changes, changes_path)
+    try:
+        stats = await run_item_pipeline(
+            headers, items_id, watch_sink,
+            log_callback=log_callback,
+            progress_callback=progress_callback,
+            fetch_item=fetch_item,
+            **pipeline_options
+        )
+    finally:
+        watch_sink.close()
+    stats.update(checked=len(items_id), unchanged=stats["skipped"], changed=watch_sink.changed)
+    logger.info(
+        f"Перевірено товарів: {len(items_id)}, без змін: {stats['skipped']}, "
+        f"змінено або нових: {len(watch_sink.changed)}, помилок: {stats['failed']}"
+    )
+    return stats